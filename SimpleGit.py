@@ -12,8 +12,15 @@
 
 from truegit import TrueGit
 from pathlib import Path
+from contextlib import contextmanager
+from functools import wraps
+from itertools import islice, repeat
+import os
+import stat
+import threading
+import time
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from dataclasses import dataclass
 
 #from typing import List, Dict, Optional
@@ -28,21 +35,64 @@ class SimpleGitResult:
     data: Optional[Dict[str, Any]] = None
 
 
+def _locked(method):
+    """
+    Exécute la méthode sous le verrou du dépôt (une seule opération à la fois).
+    
+    Les branches en cache et la branche courante sont relues si les refs ou
+    HEAD ont changé sur le disque (autre processus, git en ligne de commande).
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            self.repo.refresh_refs()
+            self.repo.refresh_head()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class SimpleGit:
+    # Nombre de commits dont les différences sont calculées en parallèle dans ls
+    LOG_WINDOW = 64
+    # Nombre maximal de contenus décodés gardés en cache par read
+    READ_CACHE_MAX = 256
+
     #def __init__(self, repo_path: str | Path, default_branch: str = "main"):
     def __init__(self, repo_path: str, default_branch: str = "main"):
         self.repo_path=repo_path
+        # Racine du dépôt résolue une seule fois, réutilisée par toutes les méthodes
+        self._repo_root = Path(repo_path).resolve()
+        self._root_str = str(self._repo_root)
         self.repo=TrueGit(repo_path,default_branch)
         self.default_branch=default_branch
-        if len(self.repo.get_commit()) == 0:
+        # Cache de ls : (branche, répertoire) -> (sha de tête, derniers commits fichiers, répertoires)
+        self._ls_cache = {}
+        # Cache de read : fichier du working tree -> ((mtime, taille, encodage), contenu)
+        # et (SHA du blob, encodage) -> contenu pour les autres branches
+        self._read_cache = {}
+        self._blob_cache = {}
+        # Cache de status : (clé, résultat) ; la génération change à chaque
+        # modification du working tree faite par SimpleGit
+        self._status_cache = None
+        self._generation = 0
+        # Batch en cours (voir batch()) : branche cible et chemins écrits
+        self._batch = None
+        # Le working tree est partagé (switch de branche) : les opérations
+        # venant de threads différents sont sérialisées
+        self._lock = threading.RLock()
+        # Dépôt sans commit : un simple test de HEAD, sans parcourir l'historique
+        if self.repo._get_head_commit() is None:
             print('Initialisation Simple du repo')
+            # Un seul commit (tree vide) ; la référence de la branche courante
+            # est écrite par le commit, elle n'est pas réécrite ensuite
             self.repo.commit(message="Init repo", author="SimpleGit <None>")
-            self.repo.create_branch(default_branch)
-        print(self.repo.status())
+            if not self.repo.branch_exists(default_branch):
+                self.repo.create_branch(default_branch)
     
     # ------------------------------------------------------------
     # Core operations
     # ------------------------------------------------------------
+    @_locked
     def write(
         self,
         filename: str,
@@ -55,51 +105,268 @@ class SimpleGit:
  
         if not branch:
             branch=self.default_branch
+        try:
+            file_path = self._full_path(filename)
+        except ValueError as e:
+            return SimpleGitResult(False, f"❌ {e}", data={"file": filename, "commit": 0, "branch": branch})
+        # Chemin relatif normalisé, tel qu'il apparaît dans l'index
+        filename = file_path[len(self._root_str) + 1:]
+        if self._batch is not None:
+            return self._write_in_batch(filename, file_path, content, branch, encoding)
         msg="Je ne sais quoi dire"
         commit_sha=0
-        # Sauvegarder la branche courante
-        original_branch = self.repo.current_branch()
+        new_content = content.encode(encoding)
+        new_sha = self.repo._blob_sha(new_content)
         
-        try:
-            # Basculer sur la branche cible
-            # Si la branche n'existe pas, la créer
-            try:
-                self.repo.switch(branch)
-            except ValueError:
-                # La branche n'existe pas, la créer
-                #commit_sha = self.repo.commit(message=message, author=author)
+        if branch != self.repo.current_branch():
+            # Autre branche : commit direct sur son tree, sans checkout aller-retour
+            # ni écriture dans le working tree (qui reste celui de la branche courante)
+            if not self.repo.branch_exists(branch):
                 self.repo.create_branch(branch)
-                self.repo.switch(branch)
-            
-            # Créer ou mettre à jour le fichier
-            file_path = Path(self.repo_path) / filename
-            old_content=self.read(filename,branch,encoding).data.get('content',None)
-            if old_content != content:
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                file_path.write_text(content)
-                file_path.read_text()
-            
-                # Ajouter à l'index et commiter
-                self.repo.add(filename)
-                commit_sha = self.repo.commit(message=f'[{filename}] {message}"', author=author)
-            
-                msg=f"✅ Commit {commit_sha[:8]} créé dans la branche '{branch}'"
-            else:
+            entry = self.repo._lookup_path(self.repo._branch_tree(branch), filename)
+            if entry is not None and entry[1] == new_sha:
                 msg=f"✅ Commit {filename} deja a jour dans la branche '{branch}'"
+            else:
+                try:
+                    commit_sha = self.repo.commit_to_branch(
+                            branch, {filename: new_content}, message=f'[{filename}] {message}"', author=author,
+                            shas={filename: new_sha})
+                except ValueError as e:
+                    # Conflit fichier/répertoire dans le tree de la branche
+                    return SimpleGitResult(False, f"❌ {e}", data={"file": filename, "commit": 0, "branch": branch})
+                self._remember_blob(new_sha, content, encoding)
+                msg=f"✅ Commit {commit_sha[:8]} créé dans la branche '{branch}'"
+        
+        # Branche courante : l'index suit HEAD, comparer les SHA suffit,
+        # sans relire le fichier
+        elif self.repo.index_sha(filename) != new_sha:
+            error = self._write_file(filename, file_path, new_content)
+            if error:
+                return SimpleGitResult(False, f"❌ {error}", data={"file": filename, "commit": 0, "branch": branch})
+            
+            # Indexer le contenu déjà en mémoire et commiter ce seul chemin sur le tree de HEAD
+            self.repo.stage_bytes(filename, new_content, sha1=new_sha)
+            self._remember_blob(new_sha, content, encoding)
+            commit_sha = self.repo.commit(message=f'[{filename}] {message}"', author=author, paths=[filename])
             
-        finally:
-            # Toujours revenir à la branche d'origine
-            if self.repo.current_branch() != original_branch:
-                self.repo.switch(original_branch)
-                msg=f"🔄 Retour sur la branche '{original_branch}'"
+            msg=f"✅ Commit {commit_sha[:8]} créé dans la branche '{branch}'"
+        elif not self._worktree_matches(filename, file_path, new_sha, len(new_content)):
+            # Index et HEAD déjà à jour, mais le fichier a été modifié ou supprimé
+            # hors de SimpleGit : il est réécrit, sans commit
+            error = self._write_file(filename, file_path, new_content)
+            if error:
+                return SimpleGitResult(False, f"❌ {error}", data={"file": filename, "commit": 0, "branch": branch})
+            msg=f"✅ Commit {filename} deja a jour dans la branche '{branch}' (fichier restauré)"
+        else:
+            msg=f"✅ Commit {filename} deja a jour dans la branche '{branch}'"
 
-        print(self.repo.status())
         return SimpleGitResult(
                 commit_sha != 0,msg,
                 data={"file": filename, "commit": commit_sha, "branch": branch},
                 )
 
 
+    @_locked
+    def write_many(
+        self,
+        files: Dict[str, str],
+        branch: Optional[str] = None,
+        message: str = "update",
+        author: str = "simplegit <local>",
+        encoding="utf-8",
+    ) -> SimpleGitResult:
+        """
+        Écrit plusieurs fichiers et crée un unique commit.
+        
+        Équivalent d'une boucle de write() dans un batch() : l'index n'est
+        écrit qu'une fois et un seul commit est créé. Sur une autre branche
+        que la branche courante, le commit est fait directement sur son tree,
+        sans checkout.
+        
+        Args:
+            files: Dictionnaire {chemin: contenu}
+            branch: Branche cible (défaut: branche par défaut)
+            message: Message du commit
+            author: Auteur du commit
+            encoding: Encodage des contenus
+        
+        Returns:
+            SimpleGitResult avec les fichiers commités et le SHA du commit (0 si rien n'a changé)
+        """
+        if not branch:
+            branch=self.default_branch
+        # Tous les chemins sont validés avant la moindre écriture
+        paths = {}
+        for filename, content in files.items():
+            try:
+                file_path = self._full_path(filename)
+            except ValueError as e:
+                return SimpleGitResult(False, f"❌ {e}", data={"files": [], "commit": 0, "branch": branch})
+            paths[file_path[len(self._root_str) + 1:]] = (file_path, content)
+        
+        if branch == self.repo.current_branch():
+            failed = None
+            try:
+                with self.batch(message=message, author=author, branch=branch) as result:
+                    for filename, (file_path, content) in paths.items():
+                        written = self._write_in_batch(filename, file_path, content, branch, encoding)
+                        if not written.success:
+                            # Comme sur une autre branche : rien n'est commité
+                            # (le batch restaure les fichiers déjà écrits)
+                            failed = written
+                            raise ValueError(written.message)
+            except ValueError:
+                if failed is None:
+                    raise
+                return SimpleGitResult(False, failed.message, data={"files": [], "commit": 0, "branch": branch})
+            return result
+        
+        if not self.repo.branch_exists(branch):
+            self.repo.create_branch(branch)
+        # Seuls les fichiers dont le blob change entrent dans le commit
+        tree_sha = self.repo._branch_tree(branch)
+        changed = {}
+        shas = {}
+        blobs = []
+        for filename, (file_path, content) in paths.items():
+            new_content = content.encode(encoding)
+            new_sha = self.repo._blob_sha(new_content)
+            entry = self.repo._lookup_path(tree_sha, filename)
+            if entry is None or entry[1] != new_sha:
+                changed[filename] = new_content
+                shas[filename] = new_sha
+                blobs.append((new_sha, content))
+        
+        if not changed:
+            return SimpleGitResult(
+                    False,f"✅ Rien à commiter dans la branche '{branch}'",
+                    data={"files": [], "commit": 0, "branch": branch},
+                    )
+        try:
+            # Les SHA du test de changement servent aussi au commit : un seul hash par blob
+            commit_sha = self.repo.commit_to_branch(branch, changed, message=message, author=author, shas=shas)
+        except ValueError as e:
+            # Conflit fichier/répertoire dans le tree de la branche
+            return SimpleGitResult(False, f"❌ {e}", data={"files": [], "commit": 0, "branch": branch})
+        for new_sha, content in blobs:
+            self._remember_blob(new_sha, content, encoding)
+        return SimpleGitResult(
+                True,f"✅ Commit {commit_sha[:8]} créé dans la branche '{branch}' ({len(changed)} fichier(s))",
+                data={"files": list(changed), "commit": commit_sha, "branch": branch},
+                )
+
+
+    def _write_in_batch(self, filename: str, file_path: str, content: str, branch: str, encoding: str) -> SimpleGitResult:
+        """Écrit le fichier sur le disque et le note pour le commit unique du batch."""
+        if branch != self._batch["branch"]:
+            return SimpleGitResult(
+                    False,f"❌ Batch en cours sur '{self._batch['branch']}', écriture refusée sur '{branch}'",
+                    data={"file": filename, "commit": 0, "branch": branch},
+                    )
+        
+        # L'index suit le working tree pendant le batch : comparer les SHA suffit
+        new_content = content.encode(encoding)
+        new_sha = self.repo._blob_sha(new_content)
+        indexed = self.repo.index_sha(filename) == new_sha
+        if not indexed or not self._worktree_matches(filename, file_path, new_sha, len(new_content)):
+            # Les répertoires déjà créés pendant le batch ne sont pas revérifiés
+            error = self._write_file(filename, file_path, new_content, self._batch["dirs"])
+            if error:
+                return SimpleGitResult(False, f"❌ {error}", data={"file": filename, "commit": 0, "branch": branch})
+        if not indexed:
+            # Indexer depuis la mémoire : le fichier n'est pas relu au commit
+            self.repo.stage_bytes(filename, new_content, sha1=new_sha)
+            self._remember_blob(new_sha, content, encoding)
+            # Un dict garde l'ordre d'écriture et dédoublonne les chemins
+            self._batch["paths"][str(Path(filename))] = None
+        
+        return SimpleGitResult(
+                True,f"📝 {filename} en attente du commit du batch",
+                data={"file": filename, "commit": 0, "branch": branch},
+                )
+
+    @contextmanager
+    def batch(self, message: str = "update", author: str = "simplegit <local>", branch: Optional[str] = None):
+        """
+        Regroupe plusieurs write() en un seul commit.
+        
+        Dans le bloc, write() ne fait qu'écrire les fichiers ; à la sortie,
+        l'index est mis à jour en une fois et un unique commit est créé.
+        Si le bloc lève une exception, les fichiers écrits sont restaurés
+        depuis la branche et rien n'est commité.
+        
+        Args:
+            message: Message du commit
+            author: Auteur du commit
+            branch: Branche cible (défaut: branche par défaut)
+        
+        Returns:
+            SimpleGitResult rempli à la sortie du bloc (commit 0 si rien n'a changé)
+        
+        Exemple:
+            with repo.batch("import") as result:
+                repo.write("a.md", "...")
+                repo.write("b.md", "...")
+        """
+        # Le verrou est gardé pendant tout le bloc : les écritures des autres
+        # threads attendent la fin du batch au lieu de s'y mêler
+        with self._lock:
+            if self._batch is not None:
+                raise RuntimeError("Un batch est déjà en cours")
+            if not branch:
+                branch=self.default_branch
+        
+            original_branch = self.repo.current_branch()
+            if original_branch != branch:
+                if not self.repo.branch_exists(branch):
+                    self.repo.create_branch(branch)
+                self.repo.switch(branch)
+        
+            result = SimpleGitResult(
+                    False,f"✅ Rien à commiter dans la branche '{branch}'",
+                    data={"files": [], "commit": 0, "branch": branch},
+                    )
+            self._batch = {"branch": branch, "paths": {}, "dirs": set()}
+            try:
+                # L'index n'est écrit qu'une fois, à la fin du batch
+                with self.repo.index_transaction():
+                    try:
+                        yield result
+                    except BaseException:
+                        self._discard_batch()
+                        raise
+                
+                    paths = list(self._batch["paths"])
+                    if paths:
+                        commit_sha = self.repo.commit(message=message, author=author, paths=paths)
+                        result.success = True
+                        result.message = f"✅ Commit {commit_sha[:8]} créé dans la branche '{branch}' ({len(paths)} fichier(s))"
+                        result.data = {"files": paths, "commit": commit_sha, "branch": branch}
+            finally:
+                self._batch = None
+                # Toujours revenir à la branche d'origine
+                if original_branch != branch:
+                    self.repo.switch(original_branch)
+
+    def _discard_batch(self):
+        """Remet les fichiers écrits pendant le batch, et leur index, dans leur état commité."""
+        branch = self._batch["branch"]
+        self.repo.reset_index_paths(self._batch["paths"])
+        for rel_path in self._batch["paths"]:
+            file_path = self._full_path(rel_path)
+            self._touched(rel_path)
+            try:
+                content = self.repo.read_blob(branch, rel_path)
+            except FileNotFoundError:
+                # Fichier créé pendant le batch (déjà absent : rien à faire)
+                try:
+                    os.unlink(file_path)
+                except FileNotFoundError:
+                    pass
+            else:
+                self.repo._atomic_write(file_path, content)
+
+    @_locked
     def delete(self, repo_path: str, filename: str, branch: Optional[str]=None, 
                               message: str = "delete", author: str = "simplegit <local>", killbranch: bool = False) -> bool:
         """
@@ -118,101 +385,88 @@ class SimpleGit:
             bool: True si le fichier a été supprimé avec succès, False sinon
         """
         original_branch = self.repo.current_branch()
-        branch_deleted = False
         if not branch:
             branch=self.default_branch
-        if killbranch and branche == self.default_branch:
+        if killbranch and branch == self.default_branch:
             killbranch=False
         
         try:
             # Vérifier si la branche existe
-            try:
-                self.repo.switch(branch)
-            except ValueError:
+            if not self.repo.branch_exists(branch):
                 print(f"❌ La branche '{branch}' n'existe pas")
-                # Créer un commit vide pour documenter l'échec
                 error_message = f"Tentative échouée: branche '{branch}' introuvable"
-                (Path(self.repo_path) / ".gitkeep").write_text("")
-                self.repo.add(".gitkeep")
-                commit=self.repo.commit(message=error_message, author=author)
                 return SimpleGitResult(
                         False,error_message,
-                        data={"file": filename, "commit": commit, "branch": branch},
+                        data={"file": filename, "commit": 0, "branch": branch},
                         )
+            file_path = self._full_path(filename)
+            filename = file_path[len(self._root_str) + 1:]
+            if branch != original_branch:
+                # Autre branche : suppression directe dans son tree, sans
+                # checkout aller-retour ni parcours du working tree
+                return self._delete_on_branch(filename, branch, message, author, killbranch)
+            
+            # Compter les fichiers restants d'après l'index en mémoire
+            # (un test d'appartenance, sans lister ni trier les chemins)
+            rel_path = str(Path(filename))
+            remaining_count = len(self.repo.index) - (rel_path in self.repo.index)
+            kill = remaining_count == 0 and killbranch
             
-            # Vérifier si le fichier existe
-            file_path = Path(self.repo_path) / filename
-            if not file_path.exists():
+            try:
+                if kill:
+                    # Branche vidée : le fichier n'est pas supprimé à la main,
+                    # le switch ci-dessous aligne le working tree sur l'autre
+                    # branche (qui peut contenir ce même fichier)
+                    os.stat(file_path)
+                else:
+                    # L'unlink sert aussi de test d'existence
+                    os.unlink(file_path)
+            except FileNotFoundError:
                 print(f"❌ Le fichier '{filename}' n'existe pas dans la branche '{branch}'")
-                # Créer un commit vide pour documenter l'échec
                 error_message = f"Tentative échouée: fichier '{filename}' introuvable dans '{branch}'"
-                (Path(self.repo_path) / ".gitkeep").write_text("")
-                self.repo.add(".gitkeep")
-                commit=self.repo.commit(message=error_message, author=author)
                 return SimpleGitResult(
                         False,error_message,
-                        data={"file": filename, "commit": commit, "branch": branch},
+                        data={"file": filename, "commit": 0, "branch": branch},
                         )
-            
-            # Supprimer le fichier
-            file_path.unlink()
+            self._touched(filename)
             print(f"✅ Fichier '{filename}' supprimé")
             
-            # Compter les fichiers restants (hors .git)
-            remaining_files = []
-            for item in Path(self.repo_path).rglob('*'):
-                if item.is_file() and '.git' not in item.parts:
-                    remaining_files.append(item)
-            
             # Si la branche devient vide et killbranch est activé
-            if len(remaining_files) == 0 and killbranch:
+            if kill:
                 print(f"⚠️  La branche '{branch}' est maintenant vide")
                 
-                # Retourner sur la branche d'origine avant de supprimer
-                if branch != original_branch:
-                    self.repo.switch(original_branch)
-                    print(f"🔄 Retour sur la branche '{original_branch}'")
+                # On supprime la branche courante : basculer sur main
+                if self.repo.branch_exists("main"):
+                    self.repo.switch("main")
+                    print(f"🔄 Basculement sur 'main' (branche par défaut)")
                 else:
-                    # Si on supprime la branche courante, basculer sur main
-                    try:
-                        self.repo.switch("main")
-                        original_branch = "main"
-                        print(f"🔄 Basculement sur 'main' (branche par défaut)")
-                    except:
-                        # Si main n'existe pas, créer une branche temporaire
-                        branches = self.repo.list_branches()
-                        branch_names = [b.strip().lstrip('* ') for b in branches]
-                        other_branches = [b for b in branch_names if b != branch]
-                        if other_branches:
-                            self.repo.switch(other_branches[0])
-                            original_branch = other_branches[0]
-                            print(f"🔄 Basculement sur '{other_branches[0]}'")
+                    # Si main n'existe pas, créer une branche temporaire
+                    other_branches = [b for b in self.repo.list_branches() if b != branch]
+                    if other_branches:
+                        self.repo.switch(other_branches[0])
+                        print(f"🔄 Basculement sur '{other_branches[0]}'")
+                    else:
+                        # Aucune autre branche : pas de switch, suppression à la main
+                        os.unlink(file_path)
                 
                 # Supprimer la branche vide
                 self.repo.delete_branch(branch)
-                branch_deleted = True
                 print(f"🗑️  Branche '{branch}' supprimée (vide)")
                 
-                # Créer un commit pour documenter la suppression
-                (Path(self.repo_path) / ".gitkeep").write_text("")
-                self.repo.add(".gitkeep")
+                # La suppression de la référence suffit, pas de commit à créer
                 commit_msg = f"Branch '{branch}' deleted: {message} (branch was empty)"
-                commit=self.repo.commit(message=commit_msg, author=author)
                 return SimpleGitResult(
                         True,commit_msg,
-                        data={"file": filename, "commit": commit, "branch": branch},
+                        data={"file": filename, "commit": 0, "branch": branch},
                         )
             
-            # Sinon, commiter normalement la suppression
-            # Ajouter tous les fichiers restants pour recréer le tree
-            for item in remaining_files:
-                rel_path = str(item.relative_to(self.repo_path))
-                self.repo.add(rel_path)
-            
-            # Commiter la suppression
-            commit_sha = self.repo.commit(message=message, author=author)
+            # Sinon, retirer le fichier de l'index et commiter la suppression
+            # avec une seule écriture de l'index
+            with self.repo.index_transaction():
+                self.repo.remove(filename)
+                commit_sha = self.repo.commit(message=message, author=author, paths=[filename])
             print(f"✅ Commit {commit_sha[:8]}: {message}")
-            print(f"📊 {len(remaining_files)} fichier(s) restant(s) dans la branche")
+            print(f"📊 {remaining_count} fichier(s) restant(s) dans la branche")
             
             return SimpleGitResult(
                     True,message,
@@ -220,69 +474,109 @@ class SimpleGit:
                     )
             
         except Exception as e:
-            error_message=f"❌ Erreur inattendue: {e}"
-            print(error_message)
-            # Créer un commit pour documenter l'erreur
-            try:
-                error_message = f"Erreur lors de la suppression de '{filename}': {str(e)}"
-                (Path(slef.repo_path) / ".gitkeep").write_text("")
-                self.repo.add(".gitkeep")
-                commit_sha=self.repo.commit(message=error_message, author=author)
-            except:
-                pass
+            print(f"❌ Erreur inattendue: {e}")
+            error_message = f"Erreur lors de la suppression de '{filename}': {str(e)}"
             return SimpleGitResult(
                     False,error_message,
-                    data={"file": filename, "commit": commit_sha, "branch": branch},
+                    data={"file": filename, "commit": 0, "branch": branch},
                     )
-            
-        finally:
-            # Toujours revenir à la branche d'origine (si elle existe encore)
-            current = self.repo.current_branch()
-            if not branch_deleted and current != original_branch:
-                try:
-                    self.repo.switch(original_branch)
-                    msg=f"🔄 Retour sur la branche '{original_branch}'"
-                except Exception as e:
-                    msg=f"⚠️  Impossible de revenir sur '{original_branch}': {e}"
-            elif branch_deleted and current != original_branch:
-                msg=f"ℹ️  Branche supprimée, resté sur '{current}'"
-            print(msg)
 
+    def _delete_on_branch(self, filename: str, branch: str, message: str, author: str,
+                          killbranch: bool) -> SimpleGitResult:
+        """
+        Supprime un fichier d'une branche qui n'est pas la courante, sans checkout.
+        
+        Le working tree et l'index (ceux de la branche courante) ne sont pas touchés.
+        
+        Args:
+            filename: Chemin relatif normalisé du fichier
+            branch: Branche cible (différente de la branche courante)
+            message: Message du commit
+            author: Auteur du commit
+            killbranch: Si True, supprime la branche si elle devient vide
+        
+        Returns:
+            SimpleGitResult avec le SHA du commit (0 si rien n'a été commité)
+        """
+        tree_sha = self.repo._branch_tree(branch)
+        entry = self.repo._lookup_path(tree_sha, filename)
+        if entry is None or entry[0] == "40000":
+            print(f"❌ Le fichier '{filename}' n'existe pas dans la branche '{branch}'")
+            error_message = f"Tentative échouée: fichier '{filename}' introuvable dans '{branch}'"
+            return SimpleGitResult(
+                    False,error_message,
+                    data={"file": filename, "commit": 0, "branch": branch},
+                    )
+        
+        # Fichiers restants d'après le tree de la branche (trees en cache)
+        remaining_count = sum(1 for _ in self.repo._iter_tree_files(tree_sha)) - 1
+        if remaining_count == 0 and killbranch:
+            print(f"⚠️  La branche '{branch}' est maintenant vide")
+            self.repo.delete_branch(branch)
+            print(f"🗑️  Branche '{branch}' supprimée (vide)")
+            commit_msg = f"Branch '{branch}' deleted: {message} (branch was empty)"
             return SimpleGitResult(
-                    False,msg,
+                    True,commit_msg,
                     data={"file": filename, "commit": 0, "branch": branch},
                     )
+        
+        commit_sha = self.repo.commit_to_branch(branch, {filename: None}, message=message, author=author)
+        print(f"✅ Fichier '{filename}' supprimé")
+        print(f"✅ Commit {commit_sha[:8]}: {message}")
+        print(f"📊 {remaining_count} fichier(s) restant(s) dans la branche")
+        return SimpleGitResult(
+                True,message,
+                data={"file": filename, "commit": commit_sha, "branch": branch},
+                )
 
+    @_locked
     def read(self, filename: str,branch:str=None,encoding="utf-8") -> SimpleGitResult:
         msg="Rien a dire"
-        original_branch = self.repo.current_branch()
         content=None
-        statut=True
+        statut=False
         if not branch:
             branch=self.default_branch
+        filename = filename.strip("/")
         try:
-            self.repo.switch(branch)
-        except ValueError:
+            full_path = self._full_path(filename)
+        except ValueError as e:
+            return SimpleGitResult(False, f"Erreur: {e}", data={"file": filename, "content": None})
+
+        if not self.repo.branch_exists(branch):
             # La branche n'existe pas, on meurre proprement
             msg="Pas de branche"
-            content=None
-            statut=False
-        if statut:
-            filename = filename.strip("/")
-            full_path = (Path(self.repo_path) / filename).resolve()
-
-            statut=False
+        else:
             try:
-                # Vérifier que ce n'est pas un répertoire
-                if full_path.is_dir():
-                    msg=f"Erreur: '{full_path}' est un répertoire, pas un fichier."
+                if branch == self.repo.current_branch():
+                    # Branche courante : le working tree fait foi ; un seul stat
+                    # suffit quand le fichier n'a pas changé depuis la dernière lecture
+                    st = os.stat(full_path)
+                    if stat.S_ISDIR(st.st_mode):
+                        raise IsADirectoryError(full_path)
+                    stamp = (st.st_mtime_ns, st.st_size, encoding)
+                    cached = self._read_cache.get(filename)
+                    if cached and cached[0] == stamp:
+                        content = cached[1]
+                    else:
+                        with open(full_path, encoding=encoding) as f:
+                            content = f.read()
+                        # Comme _worktree_sha : un fichier modifié trop récemment
+                        # peut encore changer sans que son stat ne change
+                        if time.time_ns() - st.st_mtime_ns > TrueGit.RACY_NS:
+                            self._cache_put(self._read_cache, filename, (stamp, content))
                 else:
-                    # Ouvrir et lire le fichier
-                    content=full_path.read_text()
-                    #with full_path.open("r", encoding=encoding) as f:
-                    #    content=f.read()
-                    msg=f"Le fichier '{full_path}' a ete lut."
-                    statut=True
+                    # Autre branche : lecture directe dans son tree, sans checkout
+                    # (un blob est immuable, son contenu décodé peut être gardé)
+                    # Le chemin n'est résolu qu'une fois : le blob est lu par son SHA
+                    blob_sha = self.repo.resolve_blob(branch, filename)
+                    key = (blob_sha, encoding)
+                    content = self._blob_cache.get(key)
+                    if content is None:
+                        obj_type, raw = self.repo._read_object(blob_sha)
+                        content=raw.decode(encoding)
+                        self._cache_put(self._blob_cache, key, content)
+                msg=f"Le fichier '{full_path}' a ete lut."
+                statut=True
         
             except FileNotFoundError:
                 msg=f"Erreur: le fichier '{full_path}' n'existe pas."
@@ -294,13 +588,96 @@ class SimpleGit:
                 # Erreurs d'E/S diverses
                 msg=f"Erreur d'E/S en lisant '{full_path}': {e}"
             
-        if self.repo.current_branch() != original_branch:
-            self.repo.switch(original_branch)
         return SimpleGitResult(statut , msg,
             data={"file": filename, "content": content })
             #full_path.read_text(encoding="utf-8")})
 
 
+    def _full_path(self, filename: str) -> str:
+        """
+        Chemin absolu (chaîne) d'un fichier du working tree.
+        
+        Simple jointure sur la racine précalculée, sans resolve() ; un chemin
+        qui sort du dépôt ou qui vise .git est refusé (ValueError).
+        """
+        full_path = os.path.normpath(os.path.join(self._root_str, filename.lstrip("/")))
+        if full_path != self._root_str:
+            if not full_path.startswith(self._root_str + os.sep):
+                raise ValueError(f"Chemin hors du dépôt: '{filename}'")
+            if full_path[len(self._root_str) + 1:].split(os.sep, 1)[0] == ".git":
+                raise ValueError(f"Chemin réservé: '{filename}'")
+        return full_path
+
+    def _write_file(self, filename: str, file_path: str, data: bytes,
+                    made_dirs: Optional[set] = None) -> Optional[str]:
+        """
+        Écrit un fichier du working tree (répertoires parents compris).
+        
+        Args:
+            filename: Chemin relatif normalisé
+            file_path: Chemin absolu
+            data: Contenu
+            made_dirs: Répertoires déjà créés (batch), complété au passage
+        
+        Returns:
+            None, ou le message d'erreur si le chemin est un répertoire ou
+            passe par un fichier (même message que pour une autre branche)
+        """
+        parent = os.path.dirname(file_path)
+        try:
+            if made_dirs is None or parent not in made_dirs:
+                os.makedirs(parent, exist_ok=True)
+                if made_dirs is not None:
+                    made_dirs.add(parent)
+            self.repo._atomic_write(file_path, data, durable=True)
+        except (IsADirectoryError, NotADirectoryError, FileExistsError):
+            if os.path.isdir(file_path):
+                return f"{filename} est un répertoire, pas un fichier"
+            # Premier ancêtre existant : c'est un fichier
+            parent = os.path.dirname(filename)
+            while parent and not os.path.lexists(os.path.join(self._root_str, parent)):
+                parent = os.path.dirname(parent)
+            return f"{parent} est un fichier, pas un répertoire"
+        self._touched(filename)
+        return None
+
+    def _worktree_matches(self, filename: str, file_path: str, sha1: str, size: int) -> bool:
+        """Vérifie que le fichier du working tree a bien ce contenu (blob sha1, taille size)."""
+        try:
+            st = os.stat(file_path)
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        if not stat.S_ISREG(st.st_mode) or st.st_size != size:
+            return False
+        return self.repo._worktree_sha(filename, file_path, time.time_ns(), st) == sha1
+
+    def _touched(self, filename: str):
+        """Note qu'un fichier du working tree vient d'être modifié par SimpleGit."""
+        self._read_cache.pop(filename.strip("/"), None)
+        self._generation += 1
+
+    def _remember_blob(self, sha1: str, content: str, encoding: str):
+        """
+        Garde le contenu qui vient d'être commité dans le cache des blobs.
+        
+        Une lecture de ce fichier depuis une autre branche (write sur une
+        branche qui n'est pas la courante, puis read) ne relit pas l'objet.
+        """
+        self._cache_put(self._blob_cache, (sha1, encoding), content)
+
+    def _cache_put(self, cache: Dict, key, value):
+        """
+        Ajoute une entrée à un cache de read.
+        
+        Plein (READ_CACHE_MAX), le cache oublie son plus ancien quart plutôt
+        que de tout vider.
+        """
+        if len(cache) >= self.READ_CACHE_MAX:
+            for old_key in list(islice(cache, self.READ_CACHE_MAX // 4)):
+                del cache[old_key]
+        cache[key] = value
+
+    @_locked
     def ls(self, directory: str = "",branch:str ="main") -> SimpleGitResult:
         """
         Liste les fichiers et répertoires dans une branche avec leurs métadonnées Git.
@@ -320,152 +697,270 @@ class SimpleGit:
             - last_commit_message: Message du dernier commit
             - path: Chemin complet relatif
         """
-        original_branch = self.repo.current_branch()
+        if not self.repo.branch_exists(branch):
+            raise ValueError(f"La branche '{branch}' n'existe pas")
         
-        try:
-            # Basculer sur la branche demandée
+        # Normaliser le chemin du répertoire
+        directory = directory.strip("/")
+        if branch == self.repo.current_branch():
+            # Branche courante : lister les fichiers et répertoires physiques
+            # (os.scandir : le type vient du DirEntry, sans stat par élément)
             try:
-                self.repo.switch(branch)
-            except ValueError:
-                raise ValueError(f"La branche '{branch}' n'existe pas")
+                with os.scandir(self._full_path(directory)) as it:
+                    items = [(entry.name, entry.is_dir()) for entry in it if entry.name != ".git"]
+            except (FileNotFoundError, NotADirectoryError):
+                raise ValueError(f"Le répertoire '{directory}' n'existe pas")
+        else:
+            # Autre branche : lire le tree directement, sans checkout
+            try:
+                entries = self.repo.ls_tree(branch, directory)
+            except (FileNotFoundError, NotADirectoryError):
+                raise ValueError(f"Le répertoire '{directory}' n'existe pas")
+            items = [(name, mode == "40000") for mode, name, sha1 in entries]
+        
+        # Dernier commit de chaque fichier et répertoire de la branche
+        file_last_commit, dir_last_commit = self._last_commits(branch, directory)
+        
+        # Lister les éléments du répertoire
+        results = []
+        prefix = f"{directory}/" if directory else ""
+        
+        for name, is_dir in sorted(items):
+            rel_path = prefix + name
             
-            # Normaliser le chemin du répertoire
-            if directory:
-                directory = directory.strip("/")
-                target_path = Path(self.repo_path) / directory
-                if not target_path.exists() or not target_path.is_dir():
-                    raise ValueError(f"Le répertoire '{directory}' n'existe pas")
+            # Trouver les informations du dernier commit
+            if is_dir:
+                item_type = "directory"
+                commit_data = dir_last_commit.get(rel_path)
             else:
-                target_path = Path(self.repo_path)
-            
-            # Récupérer l'historique complet
-            commits = self.repo.log()
-            
-            # Construire un cache des dernières modifications pour chaque fichier
-            file_last_commit = {}
-            
-            for commit in commits:
-                commit_sha = commit['sha']
-                commit_info = self.repo._parse_commit(commit_sha)
-                
-                # Récupérer les fichiers de ce commit
-                try:
-                    files = self.repo._get_tree_files(commit_sha)
-                    
-                    # Pour chaque fichier, si on ne l'a pas encore vu, c'est son dernier commit
-                    for filepath in files.keys():
-                        if filepath not in file_last_commit:
-                            file_last_commit[filepath] = {
-                                'sha': commit_sha,
-                                'author': commit_info['author'],
-                                'message': commit_info['message'],
-                                'date': commit_info['committer'].split()[-2]  # Extraire timestamp
-                            }
-                except:
-                    continue
-            
-            # Construire un cache pour les répertoires
-            # Un répertoire hérite de la date du fichier le plus récent qu'il contient
-            dir_last_commit = {}
+                item_type = "file"
+                commit_data = file_last_commit.get(rel_path)
             
-            for filepath, commit_data in file_last_commit.items():
-                parts = Path(filepath).parts
-                # Pour chaque niveau de répertoire parent
-                for i in range(len(parts)):
-                    dir_path = str(Path(*parts[:i+1]).parent) if i > 0 else ""
-                    if dir_path not in dir_last_commit:
-                        dir_last_commit[dir_path] = commit_data
-                    else:
-                        # Garder le commit le plus récent
-                        if int(commit_data['date']) > int(dir_last_commit[dir_path]['date']):
-                            dir_last_commit[dir_path] = commit_data
-            
-            # Lister les éléments du répertoire
-            results = []
-            seen_names = set()
+            if commit_data:
+                results.append({
+                    'name': name,
+                    'type': item_type,
+                    'path': rel_path,
+                    'last_commit_sha': commit_data['sha'],
+                    'last_commit_date': commit_data['date'],
+                    'last_commit_author': commit_data['author'],
+                    'last_commit_message': commit_data['message']
+                })
+            else:
+                # Fichier sans historique (non commité)
+                results.append({
+                    'name': name,
+                    'type': item_type,
+                    'path': rel_path,
+                    'last_commit_sha': None,
+                    'last_commit_date': None,
+                    'last_commit_author': None,
+                    'last_commit_message': "Non commité"
+                })
+        
+        return results
+
+    def _last_commits(self, branch: str, directory: str = ""):
+        """
+        Calcule le dernier commit de chaque fichier et répertoire d'une branche,
+        limité à un répertoire.
+        
+        Le résultat est mis en cache par branche et répertoire tant que la tête
+        de la branche ne change pas.
+        
+        Args:
+            branch: Branche à analyser
+            directory: Répertoire à analyser (vide = toute la branche)
+        
+        Returns:
+            Tuple (file_last_commit, dir_last_commit)
+        """
+        head_sha = self.repo._get_branch_commit(branch)
+        cached = self._ls_cache.get((branch, directory))
+        if cached and cached[0] == head_sha:
+            return cached[1], cached[2]
+        
+        # Chemin du répertoire découpé une seule fois pour tous les commits
+        parts = directory.split("/") if directory else []
+        
+        # Fichiers suivis dans le répertoire
+        head_files = set()
+        if head_sha:
+            head_tree = self._subtree(self.repo._branch_tree(branch), parts)
+            if head_tree:
+                head_files = set(self.repo._walk_tree_shas(head_tree, directory))
+        
+        # Construire un cache des dernières modifications pour chaque fichier
+        # On parcourt les commits du plus récent au plus ancien en ne regardant
+        # que les fichiers changés par rapport au parent : la première
+        # apparition d'un fichier est son dernier commit.
+        # Un répertoire hérite du commit le plus récent des fichiers qu'il
+        # contient, c'est-à-dire du premier rencontré pendant le parcours.
+        file_last_commit = {}
+        dir_last_commit = {}
+        
+        # L'historique est lu à la demande, par fenêtres de commits dont les
+        # différences sont calculées en parallèle (lectures d'objets immuables).
+        # La réduction reste séquentielle et dans l'ordre du log, et on
+        # s'arrête dès que tout est résolu.
+        history = self.repo.iter_log(branch=branch)
+        while len(file_last_commit) < len(head_files):
+            window = list(islice(history, self.LOG_WINDOW))
+            if not window:
+                break
             
-            # Lister les fichiers et répertoires physiques
-            for item in sorted(target_path.iterdir()):
-                if item.name == ".git":
-                    continue
-                
-                seen_names.add(item.name)
-                
-                # Construire le chemin relatif
-                if directory:
-                    rel_path = str(Path(directory) / item.name)
-                else:
-                    rel_path = item.name
-                
-                item_type = "directory" if item.is_dir() else "file"
-                
-                # Trouver les informations du dernier commit
-                if item_type == "file":
-                    commit_data = file_last_commit.get(rel_path, None)
-                else:
-                    # Pour un répertoire, chercher dans le cache
-                    commit_data = dir_last_commit.get(rel_path, None)
-                    
-                    # Si pas trouvé, chercher le fichier le plus récent dans ce répertoire
-                    if not commit_data:
-                        most_recent = None
-                        for filepath, data in file_last_commit.items():
-                            if filepath.startswith(rel_path + "/"):
-                                if most_recent is None or int(data['date']) > int(most_recent['date']):
-                                    most_recent = data
-                        commit_data = most_recent
+            if len(window) > 1:
+                changes_list = self._executor().map(self._commit_changes, window, repeat(directory), repeat(parts))
+            else:
+                changes_list = [self._commit_changes(window[0], directory, parts)]
+            for commit_info, changes in zip(window, changes_list):
+                for filepath in changes:
+                    if filepath in head_files and filepath not in file_last_commit:
+                        commit_data = file_last_commit[filepath] = {
+                            'sha': commit_info['sha'],
+                            'author': commit_info['author'],
+                            'message': commit_info['message'],
+                            'date': commit_info['commit_time']
+                        }
+                        for dir_path in self._parent_dirs(filepath):
+                            dir_last_commit.setdefault(dir_path, commit_data)
                 
-                if commit_data:
-                    results.append({
-                        'name': item.name,
-                        'type': item_type,
-                        'path': rel_path,
-                        'last_commit_sha': commit_data['sha'],
-                        'last_commit_date': int(commit_data['date']),
-                        'last_commit_author': commit_data['author'],
-                        'last_commit_message': commit_data['message']
-                    })
-                else:
-                    # Fichier sans historique (non commité)
-                    results.append({
-                        'name': item.name,
-                        'type': item_type,
-                        'path': rel_path,
-                        'last_commit_sha': None,
-                        'last_commit_date': None,
-                        'last_commit_author': None,
-                        'last_commit_message': "Non commité"
-                    })
-            
-            return results
-            
-        finally:
-            # Toujours revenir à la branche d'origine
-            if self.repo.current_branch() != original_branch:
-                try:
-                    self.repo.switch(original_branch)
-                except:
-                    pass 
+                # Tous les fichiers suivis ont trouvé leur dernier commit
+                if len(file_last_commit) == len(head_files):
+                    break
+        
+        self._ls_cache[(branch, directory)] = (head_sha, file_last_commit, dir_last_commit)
+        return file_last_commit, dir_last_commit
+
+    def _executor(self):
+        """
+        Pool de threads de ls : celui du dépôt, partagé avec checkout et
+        fetch/push, gardé d'un appel à l'autre au lieu d'être recréé.
+        """
+        return self.repo._executor()
+
+    @staticmethod
+    def _parent_dirs(filepath: str):
+        """
+        Liste les répertoires parents d'un chemin de tree, racine ("") comprise.
+        
+        Un seul parcours de la chaîne, sans objet Path : "a/b/c" donne "a", "a/b" puis "".
+        """
+        idx = filepath.find('/')
+        while idx >= 0:
+            yield filepath[:idx]
+            idx = filepath.find('/', idx + 1)
+        yield ""
+
+    def _subtree(self, tree_sha: str, parts: List[str]) -> Optional[str]:
+        """SHA du sous-tree d'un répertoire découpé en composants (None s'il n'existe pas dans ce tree)."""
+        if not parts:
+            return tree_sha
+        entry = self.repo._lookup_parts(tree_sha, parts)
+        return entry[1] if entry and entry[0] == "40000" else None
+
+    def _commit_changes(self, commit_info: Dict, directory: str = "", parts: Optional[List[str]] = None):
+        """
+        Liste les fichiers d'un répertoire modifiés par un commit par rapport à
+        son premier parent.
+        
+        Les sous-trees sont comparés par SHA : un commit qui ne touche pas au
+        répertoire ne coûte que la résolution de son chemin.
+        """
+        if parts is None:
+            parts = directory.split("/") if directory else []
+        parents = commit_info.get('parents')
+        tree = self._subtree(commit_info['tree'], parts)
+        parent_tree = self._subtree(self.repo._parse_commit(parents[0])['tree'], parts) if parents else None
+        return self.repo._tree_changes(parent_tree, tree, directory)
 
     # ------------------------------------------------------------
     # Status / branches / history / diff / repair
     # ------------------------------------------------------------
 
-    def status(self) -> SimpleGitResult:
+    @_locked
+    def history(self, filename: str = "", branch: Optional[str] = None, max_entries: Optional[int] = None) -> SimpleGitResult:
+        """
+        Historique des commits d'une branche, éventuellement limité à un chemin.
+        
+        Le log est parcouru à la demande : seuls les commits qui modifient le
+        chemin sont retenus et le parcours s'arrête à max_entries.
+        
+        Args:
+            filename: Fichier ou répertoire à suivre (vide = toute la branche)
+            branch: Branche à parcourir (défaut: branche par défaut)
+            max_entries: Nombre maximal de commits retournés
+        
+        Returns:
+            SimpleGitResult dont data["commits"] liste les commits, du plus récent au plus ancien
+        """
+        if not branch:
+            branch=self.default_branch
+        if not self.repo.branch_exists(branch):
+            return SimpleGitResult(False, "Pas de branche", data={"file": filename, "branch": branch, "commits": []})
+        
+        commits = [{
+                'sha': commit_info['sha'],
+                'date': commit_info['commit_time'],
+                'author': commit_info['author'],
+                'message': commit_info['message']
+            }
+            for commit_info in self.repo.iter_log(max_entries, branch, filename.strip("/") or None)
+        ]
+        return SimpleGitResult(True, f"{len(commits)} commit(s) dans la branche '{branch}'",
+            data={"file": filename, "branch": branch, "commits": commits})
+
+    def _status_key(self):
+        """
+        Clé d'invalidation du cache de status.
+        
+        Comprend le mtime de chaque répertoire du working tree (hors .git) :
+        un fichier créé, supprimé ou renommé dans un sous-répertoire change
+        le mtime de ce répertoire.
+        """
+        index_file = self.repo.git_dir / "index"
+        dir_mtimes = {"": os.stat(self._root_str).st_mtime_ns}
+        stack = [(self._root_str, "")]
+        while stack:
+            dir_path, prefix = stack.pop()
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.name == ".git" or not entry.is_dir(follow_symlinks=False):
+                        continue
+                    rel_path = f"{prefix}/{entry.name}" if prefix else entry.name
+                    dir_mtimes[rel_path] = entry.stat(follow_symlinks=False).st_mtime_ns
+                    stack.append((entry.path, rel_path))
+        return (
+            self._generation,
+            self.repo.current_branch(),
+            self.repo._get_head_commit(),
+            index_file.stat().st_mtime_ns if index_file.exists() else None,
+            dir_mtimes,
+        )
+
+    @_locked
+    def status(self, refresh: bool = False) -> SimpleGitResult:
+        """
+        Statut du working tree (fichiers modifiés, supprimés, non suivis).
+        
+        Le résultat est réutilisé tant que ni SimpleGit, ni l'index, ni
+        aucun répertoire du working tree n'ont changé : les ajouts et
+        suppressions de fichiers faits hors de SimpleGit sont vus. Un fichier
+        existant modifié sur place ne change aucun mtime de répertoire :
+        refresh=True force alors un nouveau parcours.
+        
+        Args:
+            refresh: Si True, ignore le cache
+        """
         try:
-            with chdir(self.repo_path):
-                st = porcelain.status(str(self.repo_path))
-
-            return SimpleGitResult(True, "Status OK", data={
-                "staged": {
-                    "add": [p.decode() for p in st.staged["add"]],
-                    "modify": [p.decode() for p in st.staged["modify"]],
-                    "delete": [p.decode() for p in st.staged["delete"]],
-                },
-                "unstaged": [p.decode() for p in st.unstaged],
-                "untracked": [p.decode() for p in st.untracked],
-            })
+            key = self._status_key()
+            if refresh or not self._status_cache or self._status_cache[0] != key:
+                # TrueGit renvoie déjà des listes de chemins décodés
+                self._status_cache = (key, self.repo.status())
+            # Copie : l'appelant peut modifier le résultat sans toucher au cache
+            data = {name: list(value) if isinstance(value, list) else value
+                    for name, value in self._status_cache[1].items()}
+            return SimpleGitResult(True, "Status OK", data=data)
 
         except Exception as e:
-            return SimpleGitResult(False, "Status failed", error=str(e))
-
+            return SimpleGitResult(False, f"Status failed: {e}")
@@ -5,16 +5,28 @@ import time
 import shutil
 import re
 import struct
+import threading
 from pathlib import Path
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Iterable, Iterator
 import stat
-from collections import deque
-import difflib
+from itertools import islice
+from contextlib import contextmanager
 
 
 class TrueGit:
     """Implémentation pure Python d'un client Git compatible avec les dépôts Git standard."""
     
+    # Nombre maximal d'objets parsés gardés en cache
+    CACHE_MAX = 4096
+    # Taille des blocs lus pour hasher un fichier du working tree
+    HASH_CHUNK = 1 << 20
+    # Délai (ns) en dessous duquel le stat d'un fichier ne garantit pas son contenu
+    RACY_NS = 2_000_000_000
+    # SHA-1 complet (40 caractères hexadécimaux)
+    _SHA_RE = re.compile(r"[0-9a-f]{40}")
+    # Threads du pool partagé (checkout, fetch/push, ls de SimpleGit)
+    POOL_WORKERS = max(8, os.cpu_count() or 1)
+    
     def __init__(self, repo_path: str, branch: str = "main", 
                  initial_commit: bool = False, 
                  initial_message: str = "Initial commit",
@@ -30,9 +42,43 @@ class TrueGit:
             initial_author: Auteur du commit initial (par défaut: "TrueGit <truegit@example.com>")
         """
         self.repo_path = Path(repo_path).absolute()
+        self._root_str = str(self.repo_path)
         self.git_dir = self.repo_path / ".git"
+        self._objects_dir = str(self.git_dir / "objects")
+        # Chemins des références, calculés une fois (relus à chaque refresh_refs/refresh_head)
+        self._head_path = str(self.git_dir / "HEAD")
+        self._packed_refs_path = str(self.git_dir / "packed-refs")
+        self._heads_dir = str(self.git_dir / "refs" / "heads")
         self._current_branch = branch
         self.index = {}  # Simule l'index Git
+        self._index_batch_depth = 0  # > 0 : écritures de l'index différées
+        self._index_dirty = False
+        # Entrées de l'index déjà encodées : chemin -> (sha, mode, octets)
+        self._index_entry_cache = {}
+        # Caches des objets déjà parsés (immuables, indexés par SHA)
+        self._commit_cache = {}
+        self._tree_cache = {}
+        self._tree_names_cache = {}
+        # Cache des références refs/heads (nom -> SHA), chargé à la demande
+        self._refs_cache: Optional[Dict[str, str]] = None
+        self._branch_names: Optional[List[str]] = None
+        # mtimes de packed-refs et refs/heads lors du dernier chargement du cache
+        self._refs_stamp: Optional[Tuple] = None
+        # mtime de HEAD lors de sa dernière lecture ou écriture (voir refresh_head())
+        self._head_stamp: Optional[int] = None
+        # Répertoires objects/xx déjà créés
+        self._object_dirs = set()
+        # Identités auteur/committer déjà encodées
+        self._ident_cache = {}
+        # SHA des fichiers du working tree selon leur stat : chemin -> ((mtime, taille, inode), sha)
+        self._worktree_shas: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+        # Objets déjà présents des deux côtés, par couple (objects source, objects destination),
+        # avec l'identité et le mtime du répertoire destination lors du dernier sync
+        self._synced_objects: Dict[Tuple[str, str], Tuple[Tuple[int, int, int], set]] = {}
+        # Commit dont le tree est en place dans le working tree et l'index
+        self._checked_out: Optional[str] = None
+        # Pool de threads partagé (voir _executor())
+        self._pool = None
         
         if not self.git_dir.exists():
             self._init_repository()
@@ -47,16 +93,54 @@ class TrueGit:
                 # La branche existe déjà via le commit, pas besoin de la recréer
                 pass
         else:
-            # Le dépôt existe déjà, charger la branche courante
+            # Le dépôt existe déjà, charger la branche courante et son index
             self._load_current_branch()
+            head_commit = self._get_head_commit()
+            if head_commit:
+                self._fill_index_from_tree(self._parse_commit(head_commit)["tree"])
+            self._checked_out = head_commit
     
     def _load_current_branch(self):
         """Charge la branche courante depuis HEAD."""
         head_file = self.git_dir / "HEAD"
-        if head_file.exists():
+        try:
+            self._head_stamp = os.stat(head_file).st_mtime_ns
             content = head_file.read_text().strip()
-            if content.startswith("ref: refs/heads/"):
-                self._current_branch = content.replace("ref: refs/heads/", "")
+        except FileNotFoundError:
+            return
+        if content.startswith("ref: refs/heads/"):
+            self._current_branch = content.replace("ref: refs/heads/", "")
+    
+    def refresh_head(self) -> bool:
+        """
+        Relit HEAD si le fichier a changé sur le disque (git checkout externe).
+        
+        current_branch() ne lit jamais le disque : la branche courante est
+        gardée en mémoire et mise à jour par switch(). Si HEAD a été modifié
+        hors de TrueGit, la branche et l'index sont rechargés comme à l'ouverture
+        du dépôt.
+        
+        Returns:
+            True si la branche courante a changé
+        """
+        try:
+            stamp = os.stat(self._head_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if stamp == self._head_stamp:
+            return False
+        
+        previous = self._current_branch
+        self._load_current_branch()
+        if self._current_branch == previous:
+            return False
+        
+        head_commit = self._get_head_commit()
+        self.index.clear()
+        if head_commit:
+            self._fill_index_from_tree(self._parse_commit(head_commit)["tree"])
+        self._checked_out = head_commit
+        return True
         
     def _init_repository(self):
         """Initialise la structure du dépôt Git."""
@@ -93,65 +177,158 @@ class TrueGit:
         commit_sha = self._hash_object(commit_content.encode(), "commit")
         
         # Mettre à jour la référence de branche
-        branch_file = self.git_dir / "refs" / "heads" / self._current_branch
-        branch_file.parent.mkdir(parents=True, exist_ok=True)
-        branch_file.write_text(f"{commit_sha}\n")
+        self._set_branch_ref(self._current_branch, commit_sha)
         
         # L'index reste vide (pas de fichiers)
         self.index.clear()
         self._write_index()
         
-    def _hash_object(self, data: bytes, obj_type: str) -> str:
-        """Hash un objet Git et le stocke."""
+    def _hash_object(self, data: bytes, obj_type: str, sha1: Optional[str] = None) -> str:
+        """Hash un objet Git et le stocke (sha1 : SHA déjà calculé par l'appelant)."""
+        # En-tête et contenu passés séparément au hash et à zlib : pas de
+        # copie concaténée du contenu (qui peut être gros)
         header = f"{obj_type} {len(data)}\0".encode()
-        store = header + data
-        sha1 = hashlib.sha1(store).hexdigest()
+        if sha1 is None:
+            hasher = hashlib.sha1(header)
+            hasher.update(data)
+            sha1 = hasher.hexdigest()
+        
+        obj_dir = f"{self._objects_dir}/{sha1[:2]}"
+        # Un répertoire d'objets déjà vu n'est pas recréé (un mkdir en moins par objet)
+        if sha1[:2] not in self._object_dirs:
+            os.makedirs(obj_dir, exist_ok=True)
+            self._object_dirs.add(sha1[:2])
+        obj_file = f"{obj_dir}/{sha1[2:]}"
+        
+        if not os.path.exists(obj_file):
+            compressor = zlib.compressobj()
+            compressed = compressor.compress(header) + compressor.compress(data) + compressor.flush()
+            try:
+                self._atomic_write(obj_file, compressed)
+            except FileNotFoundError:
+                # Répertoire supprimé entre-temps (git gc/prune externe)
+                os.makedirs(obj_dir, exist_ok=True)
+                self._atomic_write(obj_file, compressed)
         
-        obj_dir = self.git_dir / "objects" / sha1[:2]
-        obj_dir.mkdir(exist_ok=True)
-        obj_file = obj_dir / sha1[2:]
+        return sha1
+    
+    def _blob_sha(self, data: bytes) -> str:
+        """Calcule le SHA d'un blob sans l'écrire dans le dépôt."""
+        hasher = hashlib.sha1(f"blob {len(data)}\0".encode())
+        hasher.update(data)
+        return hasher.hexdigest()
+    
+    @staticmethod
+    def _atomic_write(path, data: bytes, durable: bool = False):
+        """
+        Écrit un fichier de façon atomique : fichier temporaire puis os.replace.
         
-        if not obj_file.exists():
-            compressed = zlib.compress(store)
-            obj_file.write_bytes(compressed)
+        Un lecteur voit l'ancien contenu ou le nouveau, jamais un fichier
+        tronqué. Les droits d'un fichier existant (bit exécutable compris)
+        sont conservés.
         
-        return sha1
+        Args:
+            path: Chemin du fichier
+            data: Contenu complet
+            durable: Si True, fsync du fichier temporaire avant le renommage et
+                du répertoire après (le chemin désigne après un crash l'ancien
+                contenu ou le nouveau, complet). Par défaut pas de fsync, comme
+                git pour les objets, les refs et l'index.
+        """
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            try:
+                os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if durable:
+            dir_fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    
+    @staticmethod
+    def _write_new_file(path: str, data: bytes, executable: bool = False):
+        """
+        Crée un fichier du working tree avec ses droits en un seul open.
+        
+        os.open/os.write sans objet fichier Python ; le bit exécutable est
+        donné à la création (pas de stat + chmod ensuite).
+        """
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o755 if executable else 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
     
     def _read_object(self, sha1: str) -> Tuple[str, bytes]:
         """Lit un objet Git depuis le dépôt."""
-        obj_file = self.git_dir / "objects" / sha1[:2] / sha1[2:]
-        
-        if not obj_file.exists():
+        # Une seule ouverture (pas de test d'existence préalable), chemin en chaîne
+        try:
+            with open(f"{self._objects_dir}/{sha1[:2]}/{sha1[2:]}", "rb") as f:
+                compressed = f.read()
+        except FileNotFoundError:
             raise ValueError(f"Objet {sha1} introuvable")
         
-        compressed = obj_file.read_bytes()
         data = zlib.decompress(compressed)
         
         null_idx = data.index(b'\0')
-        header = data[:null_idx].decode()
+        obj_type = data[:data.index(b' ', 0, null_idx)].decode()
         content = data[null_idx + 1:]
-        obj_type = header.split()[0]
         
         return obj_type, content
     
     def _parse_tree(self, tree_content: bytes) -> List[Tuple[str, str, str]]:
         """Parse le contenu d'un tree Git."""
         entries = []
+        append = entries.append
+        find = tree_content.index
+        end = len(tree_content)
         i = 0
-        while i < len(tree_content):
-            space_idx = tree_content.index(b' ', i)
-            mode = tree_content[i:space_idx].decode()
-            
-            null_idx = tree_content.index(b'\0', space_idx)
-            name = tree_content[space_idx + 1:null_idx].decode()
-            
-            sha1 = tree_content[null_idx + 1:null_idx + 21].hex()
-            entries.append((mode, name, sha1))
-            
+        while i < end:
+            space_idx = find(b' ', i)
+            null_idx = find(b'\0', space_idx)
+            append((
+                tree_content[i:space_idx].decode(),
+                tree_content[space_idx + 1:null_idx].decode(),
+                tree_content[null_idx + 1:null_idx + 21].hex(),
+            ))
             i = null_idx + 21
         
         return entries
     
+    def _read_tree(self, tree_sha: str) -> List[Tuple[str, str, str]]:
+        """Lit et parse un tree, avec mise en cache par SHA."""
+        entries = self._tree_cache.get(tree_sha)
+        if entries is None:
+            obj_type, content = self._read_object(tree_sha)
+            if obj_type != "tree":
+                raise ValueError(f"L'objet {tree_sha} n'est pas un tree")
+            entries = self._parse_tree(content)
+            self._cache_store(self._tree_cache, tree_sha, entries)
+        return entries
+    
+    def _tree_names(self, tree_sha: str) -> Dict[str, Tuple[str, str]]:
+        """Entrées d'un tree indexées par nom (nom -> (mode, sha)), avec mise en cache."""
+        names = self._tree_names_cache.get(tree_sha)
+        if names is None:
+            names = {name: (mode, sha1) for mode, name, sha1 in self._read_tree(tree_sha)}
+            self._cache_store(self._tree_names_cache, tree_sha, names)
+        return names
+    
     def _create_tree_from_index(self, path: Path = None) -> str:
         """Crée un objet tree à partir des fichiers du répertoire."""
         if path is None:
@@ -159,166 +336,390 @@ class TrueGit:
         
         entries = []
         
-        for item in sorted(path.iterdir()):
-            if item.name == ".git":
-                continue
-            
-            if item.is_file():
-                content = item.read_bytes()
-                sha1 = self._hash_object(content, "blob")
-                mode = "100644"
-                if os.access(item, os.X_OK):
-                    mode = "100755"
-                entries.append((mode, item.name, sha1))
-            elif item.is_dir():
-                sha1 = self._create_tree_from_index(item)
-                mode = "40000"
-                entries.append((mode, item.name, sha1))
-        
-        # Si aucun fichier, créer un tree vide
+        # os.scandir : le type de chaque entrée vient du DirEntry, sans stat
+        with os.scandir(path) as it:
+            for item in it:
+                if item.name == ".git":
+                    continue
+                
+                if item.is_file():
+                    with open(item.path, "rb") as f:
+                        content = f.read()
+                    sha1 = self._hash_object(content, "blob")
+                    mode = "100644"
+                    if os.access(item.path, os.X_OK):
+                        mode = "100755"
+                    entries.append((mode, item.name, sha1))
+                elif item.is_dir():
+                    sha1 = self._create_tree_from_index(Path(item.path))
+                    mode = "40000"
+                    entries.append((mode, item.name, sha1))
+        
+        # Si aucun fichier, on obtient le tree vide
+        return self._write_tree(entries)
+    
+    def _write_tree(self, entries: List[Tuple[str, str, str]]) -> str:
+        """
+        Stocke un objet tree à partir de ses entrées (mode, nom, sha).
+        
+        Les entrées sont triées dans l'ordre Git : un répertoire se compare
+        comme si son nom se terminait par '/'. Le tree écrit est mis en cache
+        tel que _read_tree le produirait : un read/ls juste après ne le relit pas.
+        """
+        entries = sorted(entries, key=lambda e: e[1] + "/" if e[0] == "40000" else e[1])
+        tree_content = b"".join(
+            f"{mode} {name}\0".encode() + bytes.fromhex(sha1) for mode, name, sha1 in entries
+        )
+        
+        tree_sha = self._hash_object(tree_content, "tree")
+        self._cache_store(self._tree_cache, tree_sha, entries)
+        return tree_sha
+    
+    def _update_tree(self, tree_sha: Optional[str], changes: Dict[str, Optional[Dict]],
+                     prefix: str = "") -> Optional[str]:
+        """
+        Construit un nouveau tree en appliquant des changements à un tree existant.
+        
+        Seuls les sous-trees contenant un chemin modifié sont relus et réécrits,
+        les autres gardent leur SHA.
+        
+        Args:
+            tree_sha: Tree de départ (None pour partir de rien)
+            changes: Chemin relatif -> entrée d'index ({'sha', 'mode'}), ou None pour le retirer
+            prefix: Chemin du tree dans le dépôt (pour les messages d'erreur)
+        
+        Returns:
+            SHA du nouveau tree, ou None s'il ne contient plus rien
+        
+        Raises:
+            ValueError: Si un fichier remplacerait un répertoire, ou l'inverse
+        """
+        # Copie de l'index par nom en cache (il est partagé, on va le modifier)
+        entries = dict(self._tree_names(tree_sha)) if tree_sha else {}
+        
+        subchanges = {}
+        for path, entry in changes.items():
+            name, sep, rest = path.partition("/")
+            if sep:
+                subchanges.setdefault(name, {})[rest] = entry
+            elif entry is None:
+                entries.pop(name, None)
+            else:
+                old = entries.get(name)
+                if old is not None and old[0] == "40000":
+                    raise ValueError(f"{prefix}{path} est un répertoire, pas un fichier")
+                entries[name] = (entry['mode'], entry['sha'])
+        
+        for name, sub in subchanges.items():
+            old = entries.get(name)
+            if old is not None and old[0] != "40000":
+                # Un fichier retiré dans les mêmes changements n'est plus dans entries
+                raise ValueError(f"{prefix}{name} est un fichier, pas un répertoire")
+            new_sha = self._update_tree(old[1] if old else None, sub, f"{prefix}{name}/")
+            if new_sha is None:
+                entries.pop(name, None)
+            else:
+                entries[name] = ("40000", new_sha)
+        
         if not entries:
-            return self._hash_object(b"", "tree")
+            return None
+        return self._write_tree([(mode, name, sha1) for name, (mode, sha1) in entries.items()])
+    
+    def _resolve_rev(self, rev: str) -> str:
+        """
+        Résout une révision (SHA complet, branche ou tag) en SHA de commit.
         
-        tree_content = b""
-        for mode, name, sha1 in entries:
-            tree_content += f"{mode} {name}\0".encode()
-            tree_content += bytes.fromhex(sha1)
+        Un SHA complet est utilisé tel quel, sans passer par les références ;
+        seule son existence est vérifiée.
+        """
+        if self._SHA_RE.fullmatch(rev):
+            if rev in self._commit_cache or (self.git_dir / "objects" / rev[:2] / rev[2:]).exists():
+                return rev
+            raise ValueError(f"Objet {rev} introuvable")
         
-        return self._hash_object(tree_content, "tree")
+        commit_sha = self._get_branch_commit(rev)
+        if commit_sha:
+            return commit_sha
+        tag_file = self.git_dir / "refs" / "tags" / rev
+        if tag_file.is_file():
+            return tag_file.read_text().strip()
+        raise ValueError(f"Révision {rev} inconnue")
     
     def _get_head_commit(self) -> Optional[str]:
         """Récupère le SHA-1 du commit HEAD."""
-        branch_file = self.git_dir / "refs" / "heads" / self._current_branch
-        if not branch_file.exists():
-            return None
-        return branch_file.read_text().strip()
+        return self._get_branch_commit(self._current_branch)
     
-    def current_branch(self) -> str:
-        """Retourne la branche courante."""
-        return self._current_branch
+    def _get_branch_commit(self, branch_name: str) -> Optional[str]:
+        """Récupère le SHA-1 du dernier commit d'une branche."""
+        return self._refs().get(branch_name)
     
-    def ensure_branch_exists(self, branch_name: str, create_if_missing: bool = False) -> bool:
+    def _refs(self) -> Dict[str, str]:
         """
-        Vérifie qu'une branche existe, optionnellement la crée.
+        Retourne les branches locales et leur SHA, lues une seule fois sur le disque.
         
-        Args:
-            branch_name: Nom de la branche
-            create_if_missing: Si True, crée la branche si elle n'existe pas
-        
-        Returns:
-            True si la branche existe ou a été créée, False sinon
+        Le cache est tenu à jour par _set_branch_ref() et _drop_branch_ref() ;
+        refresh_refs() le relit si les refs ont été modifiées hors de TrueGit.
         """
-        branch_file = self.git_dir / "refs" / "heads" / branch_name
+        if self._refs_cache is None:
+            # Relevé avant la lecture : une modification pendant le parcours
+            # sera vue au prochain refresh_refs()
+            self._refs_stamp = self._read_refs_stamp()
+            # Références compactées (git gc / pack-refs), puis références
+            # individuelles qui ont priorité
+            refs = self._read_packed_refs()
+            stack = [(self._heads_dir, "")]
+            while stack:
+                dir_path, prefix = stack.pop()
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        name = f"{prefix}/{entry.name}" if prefix else entry.name
+                        if entry.is_dir():
+                            stack.append((entry.path, name))
+                        elif not entry.name.endswith(".tmp"):
+                            with open(entry.path) as f:
+                                refs[name] = f.read().strip()
+            self._refs_cache = refs
+            self._branch_names = None
+        return self._refs_cache
+    
+    def _read_packed_refs(self) -> Dict[str, str]:
+        """
+        Lit les branches du fichier packed-refs (nom -> SHA).
         
-        if branch_file.exists():
-            return True
+        Appelé seulement quand le cache des références est invalidé : le
+        fichier est lu en une fois (sans test d'existence préalable) et
+        découpé en un dictionnaire gardé dans _refs_cache.
+        """
+        refs = {}
+        try:
+            with open(self._packed_refs_path) as f:
+                content = f.read()
+        except FileNotFoundError:
+            return refs
+        prefix_len = len("refs/heads/")
+        for line in content.splitlines():
+            if not line or line[0] in "#^":
+                continue
+            sha1, _, ref = line.partition(" ")
+            if ref.startswith("refs/heads/"):
+                refs[ref[prefix_len:]] = sha1
+        return refs
+    
+    def _read_refs_stamp(self) -> Tuple:
+        """mtimes (ns) de packed-refs et du répertoire refs/heads (None si absent)."""
+        stamp = []
+        for path in (self._packed_refs_path, self._heads_dir):
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+    
+    def refresh_refs(self) -> bool:
+        """
+        Relit les références si packed-refs ou refs/heads ont changé sur le disque.
         
-        if create_if_missing:
-            # Vérifier qu'il y a au moins un commit pour créer une branche
-            head_commit = self._get_head_commit()
-            if not head_commit:
-                return False
-            
-            # Créer la branche
-            self.create_branch(branch_name)
-            return True
+        Deux stat au lieu d'un parcours de refs/heads. Les branches imbriquées
+        (ex. feature/x) modifiées à l'extérieur ne changent pas le mtime de
+        refs/heads : _invalidate_refs() reste nécessaire dans ce cas.
         
-        return False
+        Returns:
+            True si le cache a été invalidé
+        """
+        if self._refs_cache is None or self._read_refs_stamp() == self._refs_stamp:
+            return False
+        self._invalidate_refs()
+        return True
+    
+    def _invalidate_refs(self):
+        """Oublie les références en cache, elles seront relues au prochain accès."""
+        self._refs_cache = None
+        self._branch_names = None
+    
+    def _set_branch_ref(self, branch_name: str, commit_sha: str):
+        """Fait pointer une branche sur un commit (fichier de référence et cache)."""
+        # Référence déjà à jour : pas de réécriture
+        if self._refs().get(branch_name) == commit_sha:
+            return
+        branch_file = f"{self._heads_dir}/{branch_name}"
+        if "/" in branch_name:
+            # Branche imbriquée (ex. feature/x) : créer son répertoire
+            os.makedirs(os.path.dirname(branch_file), exist_ok=True)
+        self._atomic_write(branch_file, f"{commit_sha}\n".encode())
+        # Notre propre écriture ne doit pas provoquer de relecture
+        self._refs_stamp = self._read_refs_stamp()
+        if branch_name not in self._refs_cache:
+            self._branch_names = None
+        self._refs_cache[branch_name] = commit_sha
+    
+    def _drop_branch_ref(self, branch_name: str):
+        """Supprime la référence d'une branche (fichier et cache)."""
+        try:
+            os.unlink(f"{self._heads_dir}/{branch_name}")
+        except FileNotFoundError:
+            pass
+        
+        # Retirer aussi la branche de packed-refs, sinon elle réapparaîtrait
+        try:
+            with open(self._packed_refs_path) as f:
+                lines = f.read().splitlines(keepends=True)
+        except FileNotFoundError:
+            lines = []
+        ref_name = f"refs/heads/{branch_name}"
+        kept = [line for line in lines if line.rstrip("\n").partition(" ")[2] != ref_name]
+        if len(kept) != len(lines):
+            self._atomic_write(self._packed_refs_path, "".join(kept).encode())
+        
+        if self._refs_cache is not None:
+            self._refs_cache.pop(branch_name, None)
+            self._refs_stamp = self._read_refs_stamp()
+        self._branch_names = None
+    
+    def current_branch(self) -> str:
+        """Retourne la branche courante."""
+        return self._current_branch
+    
+    def branch_exists(self, branch_name: str) -> bool:
+        """Vérifie qu'une branche existe (simple lecture de la référence, sans checkout)."""
+        return branch_name in self._refs()
     
     def _parse_commit(self, commit_sha: str) -> Dict:
-        """Parse un commit et retourne ses informations."""
+        """Parse un commit et retourne ses informations (mis en cache par SHA)."""
+        commit_info = self._commit_cache.get(commit_sha)
+        if commit_info is not None:
+            return commit_info
+        
         obj_type, content = self._read_object(commit_sha)
         if obj_type != "commit":
             raise ValueError(f"L'objet {commit_sha} n'est pas un commit")
         
-        lines = content.decode().split('\n')
+        # En-têtes et message séparés une seule fois : seules les lignes
+        # d'en-tête sont parcourues, le message est décodé d'un bloc
+        header, sep, body = content.partition(b"\n\n")
         commit_info = {"sha": commit_sha}
         
-        for i, line in enumerate(lines):
-            if line.startswith("tree "):
-                commit_info["tree"] = line.split()[1]
-            elif line.startswith("parent "):
-                if "parents" not in commit_info:
-                    commit_info["parents"] = []
-                commit_info["parents"].append(line.split()[1])
-            elif line.startswith("author "):
-                commit_info["author"] = line[7:]
-            elif line.startswith("committer "):
-                commit_info["committer"] = line[10:]
-            elif line == "":
-                commit_info["message"] = '\n'.join(lines[i+1:]).strip()
-                break
-        
+        for line in header.decode().split("\n"):
+            key, _, value = line.partition(" ")
+            if key == "tree":
+                commit_info["tree"] = value
+            elif key == "parent":
+                commit_info.setdefault("parents", []).append(value)
+            elif key == "author":
+                commit_info["author"] = value
+            elif key == "committer":
+                commit_info["committer"] = value
+                # "Nom <email> timestamp +zone" : garder le timestamp en entier
+                commit_info["commit_time"] = int(value.rsplit(" ", 2)[1])
+        if sep:
+            commit_info["message"] = body.decode().strip()
+        
+        self._cache_store(self._commit_cache, commit_sha, commit_info)
         return commit_info
     
+    def _cache_store(self, cache: Dict, key, value):
+        """
+        Met un objet parsé en cache (commits, trees).
+        
+        Plein, le cache oublie son plus ancien quart (ordre d'insertion) plutôt
+        que de tout vider : un parcours plus long que CACHE_MAX garde les
+        objets récents, les plus relus.
+        """
+        if len(cache) >= self.CACHE_MAX:
+            for old_key in list(islice(cache, self.CACHE_MAX // 4)):
+                cache.pop(old_key, None)
+        cache[key] = value
+    
+    @contextmanager
+    def index_transaction(self):
+        """
+        Regroupe plusieurs modifications de l'index en une seule écriture.
+        
+        Dans le bloc, add/remove/commit/switch ne modifient que l'index en
+        mémoire ; le fichier .git/index est écrit une seule fois à la sortie.
+        
+        Exemple:
+            with repo.index_transaction():
+                repo.remove("a.md")
+                repo.commit("delete")
+        """
+        self._index_batch_depth += 1
+        try:
+            yield self.index
+        finally:
+            self._index_batch_depth -= 1
+            if self._index_batch_depth == 0 and self._index_dirty:
+                self._index_dirty = False
+                self._write_index()
+    
     def _write_index(self):
         """Écrit un fichier index Git (format binaire simplifié version 2)."""
+        if self._index_batch_depth:
+            # Dans une transaction : l'écriture est faite une seule fois à la fin
+            self._index_dirty = True
+            return
+        
         index_file = self.git_dir / "index"
         
         # Si l'index est vide, supprimer le fichier
         if not self.index:
-            if index_file.exists():
-                index_file.unlink()
+            try:
+                os.unlink(index_file)
+            except FileNotFoundError:
+                pass
             return
         
         # Format Git index version 2
+        # Les entrées déjà encodées dont le SHA et le mode n'ont pas changé
+        # sont reprises telles quelles : seuls les chemins modifiés sont stat-és
+        previous = self._index_entry_cache
+        cache = {}
         entries = []
         for path, data in sorted(self.index.items()):
+            sha_hex = data['sha'] if isinstance(data, dict) else data
+            mode_str = data.get('mode', '100644') if isinstance(data, dict) else '100644'
+            cached = previous.get(path)
+            if cached is not None and cached[0] == sha_hex and cached[1] == mode_str:
+                cache[path] = cached
+                entries.append(cached[2])
+                continue
+            
             # Stat du fichier
-            file_path = self.repo_path / path
-            if file_path.exists():
-                stat_info = file_path.stat()
-                ctime_s = int(stat_info.st_ctime)
-                ctime_ns = int((stat_info.st_ctime - ctime_s) * 1000000000)
-                mtime_s = int(stat_info.st_mtime)
-                mtime_ns = int((stat_info.st_mtime - mtime_s) * 1000000000)
+            try:
+                stat_info = os.stat(os.path.join(self._root_str, path))
+                ctime_s, ctime_ns = divmod(stat_info.st_ctime_ns, 1000000000)
+                mtime_s, mtime_ns = divmod(stat_info.st_mtime_ns, 1000000000)
                 dev = stat_info.st_dev & 0xFFFFFFFF  # Limiter à 32 bits
                 ino = stat_info.st_ino & 0xFFFFFFFF  # Limiter à 32 bits
-                mode = int(data['mode'], 8) if isinstance(data, dict) else 0o100644
                 uid = stat_info.st_uid
                 gid = stat_info.st_gid
-                size = stat_info.st_size
-            else:
+                size = stat_info.st_size & 0xFFFFFFFF
+            except FileNotFoundError:
                 # Valeurs par défaut si le fichier n'existe pas
                 ctime_s = ctime_ns = mtime_s = mtime_ns = 0
                 dev = ino = uid = gid = size = 0
-                mode = int(data.get('mode', '100644'), 8) if isinstance(data, dict) else 0o100644
             
-            sha_bytes = bytes.fromhex(data['sha'] if isinstance(data, dict) else data)
             path_bytes = path.encode('utf-8')
             
             # Flags: assume-valid (1 bit) + extended (1 bit) + stage (2 bits) + name length (12 bits)
             flags = min(len(path_bytes), 0xFFF)
             
-            # Construire l'entrée: 10 uint32 (40 bytes) + SHA-1 (20 bytes) + flags (2 bytes)
-            entry = struct.pack('>10I',
-                ctime_s, ctime_ns,
-                mtime_s, mtime_ns,
-                dev, ino, mode, uid, gid, size
-            )
-            entry += sha_bytes  # Ajouter les 20 bytes du SHA
-            entry += struct.pack('>H', flags)  # Ajouter les flags (2 bytes)
-            
-            # Total jusqu'ici: 62 bytes
-            
-            # Ajouter le nom du fichier (sans NUL de terminaison)
-            entry += path_bytes
-            
-            # Padding: aligner sur 8 octets
-            # La longueur totale doit être un multiple de 8
-            # On a: 62 (header) + len(path) bytes
-            # On doit ajouter assez de NUL bytes pour atteindre le prochain multiple de 8
-            # Il doit y avoir au moins 1 NUL byte après le nom
-            total_len = 62 + len(path_bytes)
-            # Calculer combien de NUL bytes ajouter (minimum 1, maximum 8)
-            # pour que (62 + len(path) + padding) % 8 == 0
-            padlen = 1
-            while (total_len + padlen) % 8 != 0:
-                padlen += 1
-            
-            entry += b'\x00' * padlen
-            
+            # Entrée : 10 uint32 (40 bytes) + SHA-1 (20 bytes) + flags (2 bytes),
+            # puis le nom suivi de 1 à 8 NUL pour aligner la longueur sur 8 octets
+            padlen = 8 - (62 + len(path_bytes)) % 8
+            entry = b"".join((
+                struct.pack('>10I',
+                    ctime_s, ctime_ns,
+                    mtime_s, mtime_ns,
+                    dev, ino, int(mode_str, 8), uid, gid, size
+                ),
+                bytes.fromhex(sha_hex),
+                struct.pack('>H', flags),
+                path_bytes,
+                b'\x00' * padlen,
+            ))
+            cache[path] = (sha_hex, mode_str, entry)
             entries.append(entry)
+        self._index_entry_cache = cache
         
         # Header: signature + version + nombre d'entrées
         header = b'DIRC'  # Signature
@@ -332,40 +733,47 @@ class TrueGit:
         index_sha = hashlib.sha1(index_content).digest()
         
         # Écrire le fichier
-        index_file.write_bytes(index_content + index_sha)
+        self._atomic_write(index_file, index_content + index_sha)
     
     def _rebuild_index_from_tree(self, tree_sha: str, prefix: str = ""):
         """Reconstruit l'index à partir d'un tree après un commit."""
         self.index.clear()
-        
-        obj_type, content = self._read_object(tree_sha)
-        if obj_type != "tree":
-            return
-        
-        entries = self._parse_tree(content)
-        
-        for mode, name, sha1 in entries:
-            path = f"{prefix}/{name}" if prefix else name
-            
-            if mode == "40000":  # Répertoire
-                self._rebuild_index_from_tree(sha1, path)
-            else:  # Fichier
-                self.index[path] = {
-                    'sha': sha1,
-                    'mode': mode
-                }
+        self._fill_index_from_tree(tree_sha, prefix)
         
         # Écrire l'index mis à jour
         self._write_index()
     
+    def _fill_index_from_tree(self, tree_sha: str, prefix: str = ""):
+        """Ajoute les fichiers d'un tree à l'index (sans l'écrire)."""
+        index = self.index
+        for path, mode, sha1 in self._iter_tree_files(tree_sha, prefix):
+            index[path] = {'sha': sha1, 'mode': mode}
+    
+    def _iter_tree_files(self, tree_sha: str, prefix: str = "") -> Iterator[Tuple[str, str, str]]:
+        """
+        Parcourt un tree et ses sous-trees (trees en cache, sans lire les blobs).
+        
+        Parcours itératif avec une pile : pas de récursion ni de dictionnaires
+        intermédiaires fusionnés à chaque niveau.
+        
+        Returns:
+            Générateur de tuples (chemin, mode, sha) des fichiers
+        """
+        stack = [(tree_sha, f"{prefix}/" if prefix else "")]
+        while stack:
+            sha1, base = stack.pop()
+            for mode, name, entry_sha in self._read_tree(sha1):
+                if mode == "40000":
+                    stack.append((entry_sha, f"{base}{name}/"))
+                else:
+                    yield base + name, mode, entry_sha
+    
     def add(self, *paths: str):
         """Ajoute des fichiers à l'index (staging area)."""
         # Vérifier qu'on est dans un état cohérent
-        branch_file = self.git_dir / "refs" / "heads" / self._current_branch
-        
         # Si on n'a aucun commit et que la branche n'existe pas, c'est OK (premier commit)
         # Sinon, la branche doit exister
-        if not branch_file.exists():
+        if not self.branch_exists(self._current_branch):
             head_commit = self._get_head_commit()
             if head_commit:
                 # On a un commit mais la branche n'existe pas - état incohérent
@@ -376,35 +784,231 @@ class TrueGit:
             if not path.is_absolute():
                 path = self.repo_path / path
             
-            if not path.exists():
+            # Un seul stat pour l'existence et le type
+            try:
+                st_mode = os.stat(path).st_mode
+            except FileNotFoundError:
                 raise FileNotFoundError(f"Le fichier {path} n'existe pas")
             
-            if path.is_file():
-                rel_path = path.relative_to(self.repo_path)
-                content = path.read_bytes()
-                # Créer le blob immédiatement pour que Git puisse le voir
-                sha1 = self._hash_object(content, "blob")
-                self.index[str(rel_path)] = {
-                    'sha': sha1,
-                    'mode': '100755' if os.access(path, os.X_OK) else '100644'
-                }
-            elif path.is_dir():
-                for item in path.rglob('*'):
-                    if item.is_file() and '.git' not in item.parts:
-                        rel_path = item.relative_to(self.repo_path)
-                        content = item.read_bytes()
-                        sha1 = self._hash_object(content, "blob")
-                        self.index[str(rel_path)] = {
-                            'sha': sha1,
-                            'mode': '100755' if os.access(item, os.X_OK) else '100644'
-                        }
+            if stat.S_ISREG(st_mode):
+                self._stage_file(path, st_mode)
+            elif stat.S_ISDIR(st_mode):
+                # Chemins relatif et complet fournis par le parcours : pas de Path par fichier
+                for rel_path, full_path in self._iter_worktree_entries(path):
+                    self._stage_path(rel_path, full_path)
         
         # Écrire l'index pour que Git puisse le voir (format simplifié)
         self._write_index()
     
+    def _iter_worktree_files(self, start: Optional[Path] = None) -> Iterator[str]:
+        """
+        Parcourt les fichiers du working tree avec os.scandir.
+        
+        Les répertoires .git sont écartés sans y descendre et le type de chaque
+        entrée vient du DirEntry (pas de stat supplémentaire).
+        
+        Args:
+            start: Répertoire de départ (par défaut: la racine du dépôt)
+        
+        Returns:
+            Générateur des chemins relatifs à la racine du dépôt
+        """
+        for rel_path, full_path in self._iter_worktree_entries(start):
+            yield rel_path
+    
+    def _iter_worktree_entries(self, start: Optional[Path] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Comme _iter_worktree_files, en donnant aussi le chemin complet venant
+        du DirEntry : l'appelant peut ouvrir le fichier sans construire de Path.
+        
+        Returns:
+            Générateur de tuples (chemin relatif, chemin complet)
+        """
+        if start is None or start == self.repo_path:
+            stack = [(str(self.repo_path), "")]
+        else:
+            stack = [(str(start), str(start.relative_to(self.repo_path)))]
+        
+        while stack:
+            dir_path, prefix = stack.pop()
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.name == ".git":
+                        continue
+                    rel_path = f"{prefix}/{entry.name}" if prefix else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, rel_path))
+                    elif entry.is_file():
+                        yield rel_path, entry.path
+    
+    def _stage_file(self, path: Path, st_mode: Optional[int] = None):
+        """Hash un fichier du working tree et met à jour son entrée d'index (sans l'écrire)."""
+        self._stage_path(str(path.relative_to(self.repo_path)), str(path), st_mode)
+    
+    def _stage_path(self, rel_path: str, full_path: str, st_mode: Optional[int] = None):
+        """
+        Comme _stage_file, à partir des chemins relatif et complet déjà connus.
+        
+        Le bit exécutable est lu dans le mode du stat (fourni ou pris sur le
+        fichier ouvert) plutôt que par un os.access séparé.
+        """
+        with open(full_path, "rb") as f:
+            if st_mode is None:
+                st_mode = os.fstat(f.fileno()).st_mode
+            content = f.read()
+        # Créer le blob immédiatement pour que Git puisse le voir
+        sha1 = self._hash_object(content, "blob")
+        self.index[rel_path] = {
+            'sha': sha1,
+            'mode': '100755' if st_mode & stat.S_IXUSR else '100644'
+        }
+    
+    def stage_bytes(self, path: str, data: bytes, mode: Optional[str] = None,
+                    sha1: Optional[str] = None):
+        """
+        Stocke un contenu connu en mémoire comme blob et l'inscrit dans l'index,
+        sans relire le fichier du working tree.
+        
+        Args:
+            path: Chemin relatif du fichier
+            data: Contenu du fichier
+            mode: Mode Git (défaut: celui de l'entrée existante, sinon 100644)
+            sha1: SHA du blob s'il est déjà calculé (voir _blob_sha), pour ne pas le recalculer
+        """
+        rel_path = str(Path(path))
+        if mode is None:
+            mode = self.index.get(rel_path, {}).get('mode', '100644')
+        self.index[rel_path] = {
+            'sha': self._hash_object(data, "blob", sha1),
+            'mode': mode
+        }
+        self._write_index()
+    
+    def reset_index_paths(self, paths: Iterable[str]):
+        """Remet les entrées d'index de ces chemins dans leur état de HEAD (git reset -- paths)."""
+        head_commit = self._get_head_commit()
+        tree_sha = self._parse_commit(head_commit)["tree"] if head_commit else None
+        for path_str in paths:
+            rel_path = str(Path(path_str))
+            entry = self._lookup_path(tree_sha, rel_path) if tree_sha else None
+            if entry and entry[0] != "40000":
+                self.index[rel_path] = {'sha': entry[1], 'mode': entry[0]}
+            else:
+                self.index.pop(rel_path, None)
+        self._write_index()
+    
+    def remove(self, *paths: str):
+        """Retire des fichiers de l'index (équivalent de git rm --cached)."""
+        for path_str in paths:
+            path = Path(path_str)
+            if path.is_absolute():
+                path = path.relative_to(self.repo_path)
+            self.index.pop(str(path), None)
+        
+        self._write_index()
+    
+    def index_sha(self, path: str) -> Optional[str]:
+        """SHA du blob inscrit dans l'index pour ce chemin (None s'il n'est pas suivi)."""
+        entry = self.index.get(str(Path(path)))
+        return entry['sha'] if entry is not None else None
+    
     def commit(self, message: str, author: Optional[str] = None, 
-               committer: Optional[str] = None, date: Optional[int] = None) -> str:
-        """Crée un commit."""
+               committer: Optional[str] = None, date: Optional[int] = None,
+               paths: Optional[Iterable[str]] = None) -> str:
+        """
+        Crée un commit.
+        
+        Sans paths, le tree est reconstruit à partir de tout le working tree.
+        Avec paths, seuls ces chemins sont repris de l'index (déjà à jour,
+        voir add/stage_bytes/remove) et appliqués au tree de HEAD : le
+        working tree n'est pas parcouru.
+        
+        Args:
+            message: Message du commit
+            author: Auteur du commit
+            committer: Committer (défaut: l'auteur)
+            date: Timestamp du commit (défaut: maintenant)
+            paths: Chemins relatifs modifiés depuis HEAD
+        
+        Returns:
+            SHA du commit créé
+        """
+        parent_sha = self._get_head_commit()
+        if paths is None:
+            tree_sha = self._create_tree_from_index()
+        else:
+            parent_tree = self._parse_commit(parent_sha)["tree"] if parent_sha else None
+            changes = {rel_path: self.index.get(rel_path) for rel_path in map(str, map(Path, paths))}
+            tree_sha = self._update_tree(parent_tree, changes) or self._write_tree([])
+        
+        commit_sha = self._write_commit(tree_sha, parent_sha, message, author, committer, date)
+        self._set_branch_ref(self._current_branch, commit_sha)
+        self._checked_out = commit_sha
+        
+        # Après le commit, reconstruire l'index à partir du tree commité
+        # pour que Git voit l'état correct (avec paths, l'index est déjà à jour)
+        if paths is None:
+            self._rebuild_index_from_tree(tree_sha)
+        
+        return commit_sha
+    
+    def commit_to_branch(self, branch_name: str, files: Dict[str, Optional[bytes]], message: str,
+                         author: Optional[str] = None, shas: Optional[Dict[str, str]] = None) -> str:
+        """
+        Commite des contenus directement sur une branche, sans checkout.
+        
+        Les blobs sont écrits, seuls les sous-trees qui mènent aux chemins
+        modifiés sont reconstruits (les autres gardent leur SHA) et la branche
+        avance sur le nouveau commit. Ni le working tree, ni l'index, ni HEAD
+        ne sont touchés : à réserver aux branches autres que la courante.
+        
+        Args:
+            branch_name: Branche à faire avancer (doit exister)
+            files: Chemin relatif -> nouveau contenu, ou None pour supprimer le fichier
+            message: Message du commit
+            author: Auteur du commit
+            shas: SHA de blob déjà calculés par l'appelant, par chemin de files
+                  (ces contenus ne sont pas rehashés)
+        
+        Returns:
+            SHA du commit créé
+        
+        Raises:
+            ValueError: Branche courante, ou conflit fichier/répertoire (voir _update_tree)
+        """
+        if branch_name == self._current_branch:
+            raise ValueError(f"{branch_name} est la branche courante : utiliser commit()")
+        parent_sha = self._get_branch_commit(branch_name)
+        if parent_sha is None:
+            raise ValueError(f"La branche {branch_name} n'existe pas")
+        parent_tree = self._parse_commit(parent_sha)["tree"]
+        
+        if shas is None:
+            shas = {}
+        changes = {}
+        for path, data in files.items():
+            rel_path = str(Path(path))
+            if data is None:
+                changes[rel_path] = None
+                continue
+            entry = self._lookup_path(parent_tree, rel_path)
+            mode = entry[0] if entry and entry[0] != "40000" else "100644"
+            changes[rel_path] = {'sha': self._hash_object(data, "blob", shas.get(path)), 'mode': mode}
+        tree_sha = self._update_tree(parent_tree, changes) or self._write_tree([])
+        
+        commit_sha = self._write_commit(tree_sha, parent_sha, message, author)
+        self._set_branch_ref(branch_name, commit_sha)
+        return commit_sha
+    
+    def _write_commit(self, tree_sha: str, parent_sha: Optional[str], message: str,
+                      author: Optional[str] = None, committer: Optional[str] = None,
+                      date: Optional[int] = None) -> str:
+        """
+        Écrit un objet commit et le met en cache (sans déplacer de branche).
+        
+        Returns:
+            SHA du commit écrit
+        """
         if author is None:
             author = "TrueGit User <truegit@example.com>"
         if committer is None:
@@ -412,44 +1016,87 @@ class TrueGit:
         if date is None:
             date = int(time.time())
         
-        tree_sha = self._create_tree_from_index()
-        parent_sha = self._get_head_commit()
-        
-        commit_content = f"tree {tree_sha}\n"
+        # Ligne d'identité datée construite une fois, partagée par author et
+        # committer quand ils sont identiques (cas de SimpleGit)
+        stamp = f" {date} +0000"
+        author_line = self._encode_ident(author) + stamp.encode()
+        committer_line = author_line if committer == author else self._encode_ident(committer) + stamp.encode()
+        commit_content = b"".join((
+            b"tree ", tree_sha.encode(),
+            b"\nparent " + parent_sha.encode() if parent_sha else b"",
+            b"\nauthor ", author_line,
+            b"\ncommitter ", committer_line,
+            b"\n\n", message.encode(), b"\n",
+        ))
+        
+        commit_sha = self._hash_object(commit_content, "commit")
+        
+        # Le nouveau commit va être relu (log, ls) : le mettre en cache tel que
+        # _parse_commit le produirait, sans relire l'objet
+        author_str = author + stamp
+        commit_info = {"sha": commit_sha, "tree": tree_sha}
         if parent_sha:
-            commit_content += f"parent {parent_sha}\n"
-        commit_content += f"author {author} {date} +0000\n"
-        commit_content += f"committer {committer} {date} +0000\n"
-        commit_content += f"\n{message}\n"
-        
-        commit_sha = self._hash_object(commit_content.encode(), "commit")
-        
-        branch_file = self.git_dir / "refs" / "heads" / self._current_branch
-        branch_file.parent.mkdir(parents=True, exist_ok=True)
-        branch_file.write_text(f"{commit_sha}\n")
-        
-        # Après le commit, reconstruire l'index à partir du tree commité
-        # pour que Git voit l'état correct
-        self._rebuild_index_from_tree(tree_sha)
-        
+            commit_info["parents"] = [parent_sha]
+        commit_info["author"] = author_str
+        commit_info["committer"] = author_str if committer == author else committer + stamp
+        commit_info["commit_time"] = date
+        commit_info["message"] = message.strip()
+        self._cache_store(self._commit_cache, commit_sha, commit_info)
         return commit_sha
     
-    def log(self, max_count: Optional[int] = None) -> List[Dict]:
-        """Affiche l'historique des commits."""
-        commits = []
-        current_sha = self._get_head_commit()
+    def _encode_ident(self, ident: str) -> bytes:
+        """Encode une identité auteur/committer, une seule fois par chaîne distincte."""
+        encoded = self._ident_cache.get(ident)
+        if encoded is None:
+            encoded = self._ident_cache[ident] = ident.encode()
+        return encoded
+    
+    def log(self, max_count: Optional[int] = None, branch: Optional[str] = None,
+            path: Optional[str] = None) -> List[Dict]:
+        """Affiche l'historique des commits (de la branche courante par défaut)."""
+        return list(self.iter_log(max_count, branch, path))
+    
+    def iter_log(self, max_count: Optional[int] = None, branch: Optional[str] = None,
+                 path: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Parcourt l'historique des commits à la demande, du plus récent au plus ancien.
+        
+        Les commits ne sont lus qu'au fur et à mesure, l'appelant peut donc
+        s'arrêter dès qu'il a ce qu'il cherche.
+        
+        Args:
+            max_count: Nombre maximal de commits retournés
+            branch: Branche à parcourir (défaut: la branche courante)
+            path: Si fourni, ne retourne que les commits qui modifient ce chemin
+                  (fichier ou répertoire) par rapport à leur premier parent
+        """
+        current_sha = self._get_branch_commit(branch) if branch else self._get_head_commit()
         count = 0
+        # Chemin découpé une seule fois ; l'entrée du parent sert au commit suivant
+        parts = [part for part in path.strip("/").split("/") if part] if path is not None else None
+        entry = missing = object()
         
         while current_sha and (max_count is None or count < max_count):
             try:
                 commit_info = self._parse_commit(current_sha)
-                commits.append(commit_info)
-                current_sha = commit_info.get("parents", [None])[0]
-                count += 1
-            except:
+            except (ValueError, zlib.error):
+                # Objet absent (historique incomplet) ou illisible : fin du parcours
                 break
-        
-        return commits
+            parent_sha = commit_info.get("parents", [None])[0]
+            
+            if parts is None:
+                yield commit_info
+                count += 1
+            else:
+                if entry is missing:
+                    entry = self._lookup_parts(commit_info["tree"], parts)
+                parent_entry = self._lookup_parts(self._parse_commit(parent_sha)["tree"], parts) if parent_sha else None
+                if entry != parent_entry:
+                    yield commit_info
+                    count += 1
+                entry = parent_entry
+            
+            current_sha = parent_sha
     
     def get_commit(self, commit_sha: Optional[str] = None) -> Optional[Dict]:
         """
@@ -466,16 +1113,21 @@ class TrueGit:
             # Retourner tous les commits
             return self.log()
         
-        # Rechercher un commit spécifique
-        all_commits = self.log()
+        # SHA complet : lecture directe de l'objet, sans parcourir l'historique
+        if self._SHA_RE.fullmatch(commit_sha):
+            try:
+                return self._parse_commit(commit_sha)
+            except ValueError:
+                return None
         
         # Supporter les SHA courts (au moins 4 caractères)
         if len(commit_sha) < 4:
             return None
         
-        # Rechercher le commit par SHA complet ou partiel
-        for commit in all_commits:
-            if commit['sha'] == commit_sha or commit['sha'].startswith(commit_sha):
+        # Rechercher le commit par SHA partiel dans l'historique, parcouru à la
+        # demande : on s'arrête au premier commit qui correspond
+        for commit in self.iter_log():
+            if commit['sha'].startswith(commit_sha):
                 return commit
         
         return None
@@ -485,26 +1137,19 @@ class TrueGit:
         head_commit = self._get_head_commit()
         if not head_commit:
             raise ValueError("Impossible de créer une branche sans commit")
-        branch_file = self.git_dir / "refs" / "heads" / name
-        branch_file.parent.mkdir(parents=True, exist_ok=True)
-        branch_file.write_text(f"{head_commit}\n")
+        self._set_branch_ref(name, head_commit)
     
     def delete_branch(self, name: str):
         """Supprime une branche."""
-        branch_file = self.git_dir / "refs" / "heads" / name
-        if branch_file.exists():
-            branch_file.unlink()
+        self._drop_branch_ref(name)
     
     def list_branches(self) -> List[str]:
-        """Liste toutes les branches."""
-        branches_dir = self.git_dir / "refs" / "heads"
-        branches = []
-        for branch_file in branches_dir.rglob('*'):
-            if branch_file.is_file():
-                branch_name = str(branch_file.relative_to(branches_dir))
-                prefix = "* " if branch_name == self._current_branch else "  "
-                branches.append(f"{prefix}{branch_name}")
-        return sorted(branches)
+        """Liste toutes les branches (noms courts, la branche courante via current_branch())."""
+        # Liste triée gardée tant que l'ensemble des branches ne change pas
+        refs = self._refs()
+        if self._branch_names is None:
+            self._branch_names = sorted(refs)
+        return list(self._branch_names)
     
     def ensure_branch_exists(self, branch_name: str, create_if_missing: bool = False) -> bool:
         """
@@ -517,9 +1162,7 @@ class TrueGit:
         Returns:
             True si la branche existe ou a été créée, False sinon
         """
-        branch_file = self.git_dir / "refs" / "heads" / branch_name
-        
-        if branch_file.exists():
+        if self.branch_exists(branch_name):
             return True
         
         if create_if_missing:
@@ -535,55 +1178,221 @@ class TrueGit:
         return False
     
     def switch(self, branch_name: str):
-        """Change de branche."""
-        branch_file = self.git_dir / "refs" / "heads" / branch_name
-        if not branch_file.exists():
+        """
+        Change de branche (sans checkout si elle est déjà la branche courante).
+        
+        Quand le commit en place est connu, seuls les fichiers qui diffèrent
+        entre les deux trees sont écrits ou supprimés ; sinon le working tree
+        est entièrement aligné sur la cible (_checkout_tree).
+        """
+        target_commit = self._get_branch_commit(branch_name)
+        if target_commit is None:
             raise ValueError(f"La branche {branch_name} n'existe pas")
         
+        # Déjà sur la branche : working tree et index sont en place
+        if branch_name == self._current_branch:
+            return
+        
         self._current_branch = branch_name
-        head_file = self.git_dir / "HEAD"
-        head_file.write_text(f"ref: refs/heads/{branch_name}\n")
+        self._atomic_write(self._head_path, f"ref: refs/heads/{branch_name}\n".encode())
+        # Notre propre écriture ne doit pas être prise pour un checkout externe
+        self._head_stamp = os.stat(self._head_path).st_mtime_ns
+        
+        # Même commit que celui en place (ex. branche tout juste créée) :
+        # rien à extraire ni à réindexer, seul HEAD change
+        if target_commit == self._checked_out:
+            return
         
-        # Charger le commit de la branche cible
-        target_commit = branch_file.read_text().strip()
+        target_tree = self._parse_commit(target_commit)['tree']
+        if self._checked_out is not None:
+            # Working tree issu d'un commit connu : n'appliquer que les
+            # différences entre les deux trees (comme git switch, les
+            # fichiers non concernés ne sont pas touchés)
+            old_tree = self._parse_commit(self._checked_out)['tree']
+            self._apply_tree_changes(old_tree, target_tree)
+        else:
+            # Restaurer les fichiers et reconstruire l'index en un seul parcours
+            self._checkout_tree(target_commit, update_index=True)
+        self._checked_out = target_commit
+    
+    def _apply_tree_changes(self, old_tree: str, new_tree: str):
+        """
+        Passe le working tree et l'index de old_tree à new_tree en ne touchant
+        que les fichiers qui diffèrent entre les deux.
         
-        # Restaurer les fichiers
-        self._checkout_tree(target_commit)
+        Les sous-trees identiques (même SHA) ne sont pas parcourus ; les
+        répertoires vidés par une suppression sont retirés.
         
-        # Reconstruire l'index à partir du commit cible
-        commit_info = self._parse_commit(target_commit)
-        self._rebuild_index_from_tree(commit_info['tree'])
+        Args:
+            old_tree: SHA du tree actuellement en place
+            new_tree: SHA du tree cible
+        """
+        writes = []
+        for rel_path in self._tree_changes(old_tree, new_tree):
+            entry = self._lookup_path(new_tree, rel_path)
+            if entry is not None and entry[0] != "40000":
+                writes.append((rel_path, entry))
+                continue
+            
+            # Fichier absent de la cible (ou remplacé par un répertoire)
+            self.index.pop(rel_path, None)
+            full_path = os.path.join(self._root_str, rel_path)
+            if os.path.lexists(full_path) and not os.path.isdir(full_path):
+                os.unlink(full_path)
+                parent = os.path.dirname(full_path)
+                while parent != self._root_str:
+                    try:
+                        os.rmdir(parent)
+                    except OSError:
+                        # Répertoire non vide (ou déjà absent) : on s'arrête
+                        break
+                    parent = os.path.dirname(parent)
+        
+        for rel_path, (mode, sha1) in writes:
+            full_path = os.path.join(self._root_str, rel_path)
+            if os.path.isdir(full_path) and not os.path.islink(full_path):
+                shutil.rmtree(full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            obj_type, blob_content = self._read_object(sha1)
+            self._atomic_write(full_path, blob_content)
+            # Les droits du fichier remplacé sont conservés : ajuster le bit exécutable
+            file_mode = os.stat(full_path).st_mode
+            if mode == "100755" and not file_mode & stat.S_IXUSR:
+                os.chmod(full_path, file_mode | stat.S_IXUSR)
+            elif mode != "100755" and file_mode & stat.S_IXUSR:
+                os.chmod(full_path, file_mode & ~(stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH))
+            self.index[rel_path] = {'sha': sha1, 'mode': mode}
+        
+        self._write_index()
+    
+    # Fichiers à extraire à partir desquels le checkout écrit en parallèle
+    CHECKOUT_PARALLEL_MIN = 32
     
-    def _checkout_tree(self, commit_sha: str):
-        """Restaure l'arborescence à partir d'un commit."""
+    def _checkout_tree(self, commit_sha: str, update_index: bool = False):
+        """
+        Restaure l'arborescence à partir d'un commit.
+        
+        Le working tree devient exactement le tree du commit (hors .git),
+        mais les fichiers dont le contenu est déjà le bon ne sont pas réécrits.
+        
+        Args:
+            commit_sha: Commit à extraire
+            update_index: Reconstruire aussi l'index, pendant le même parcours du tree
+        """
         commit_info = self._parse_commit(commit_sha)
         tree_sha = commit_info["tree"]
         
-        for item in self.repo_path.iterdir():
-            if item.name != ".git":
-                if item.is_file():
-                    item.unlink()
-                elif item.is_dir():
-                    shutil.rmtree(item)
-        
-        self._extract_tree(tree_sha, self.repo_path)
+        index = None
+        if update_index:
+            self.index.clear()
+            index = self.index
+        self._sync_tree(tree_sha, self._root_str, "", time.time_ns(), index)
+        # Fichiers réécrits : les stat en cache dans l'index ne sont plus valables
+        self._index_entry_cache = {}
+        if update_index:
+            self._write_index()
+            self._checked_out = commit_sha
+        else:
+            # L'index n'est pas reconstruit ici : à l'appelant de le faire
+            self._checked_out = None
     
-    def _extract_tree(self, tree_sha: str, target_path: Path):
-        """Extrait récursivement un tree dans un répertoire."""
-        obj_type, content = self._read_object(tree_sha)
-        entries = self._parse_tree(content)
+    def _sync_tree(self, tree_sha: str, dir_path: str, prefix: str, now: int,
+                   index: Optional[Dict[str, Dict]] = None):
+        """
+        Aligne un répertoire du working tree sur un tree.
         
-        for mode, name, sha1 in entries:
-            item_path = target_path / name
+        Les entrées absentes du tree sont supprimées ; un fichier n'est écrit
+        que si son SHA (via le cache de stat de status) diffère de celui du tree.
+        Les sous-répertoires sont parcourus avec une pile, sans récursion ;
+        les blobs à écrire sont extraits à la fin, en parallèle s'ils sont nombreux.
+        
+        Args:
+            tree_sha: SHA du tree à extraire
+            dir_path: Chemin absolu du répertoire
+            prefix: Chemin relatif du répertoire (vide = racine)
+            now: Heure du checkout en nanosecondes
+            index: Index à remplir avec les fichiers du tree au fil du parcours
+        """
+        writes = []
+        stack = [(tree_sha, dir_path, prefix)]
+        while stack:
+            tree_sha, dir_path, prefix = stack.pop()
+            entries = self._tree_names(tree_sha)
+            try:
+                with os.scandir(dir_path) as it:
+                    existing = {entry.name: entry for entry in it}
+            except FileNotFoundError:
+                os.makedirs(dir_path)
+                existing = {}
             
-            if mode == "40000":
-                item_path.mkdir(exist_ok=True)
-                self._extract_tree(sha1, item_path)
-            else:
-                obj_type, blob_content = self._read_object(sha1)
-                item_path.write_bytes(blob_content)
-                if mode == "100755":
-                    item_path.chmod(item_path.stat().st_mode | stat.S_IXUSR)
+            for name, entry in existing.items():
+                if name in entries or (not prefix and name == ".git"):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
+            
+            for name, (mode, sha1) in entries.items():
+                item_path = os.path.join(dir_path, name)
+                rel_path = f"{prefix}/{name}" if prefix else name
+                current = existing.get(name)
+                
+                if mode == "40000":
+                    if current is not None and not current.is_dir(follow_symlinks=False):
+                        os.unlink(item_path)
+                    stack.append((sha1, item_path, rel_path))
+                    continue
+                
+                if index is not None:
+                    index[rel_path] = {'sha': sha1, 'mode': mode}
+                if current is not None:
+                    # Un seul stat par fichier, partagé avec _worktree_sha
+                    file_stat = current.stat() if current.is_file(follow_symlinks=False) else None
+                    if current.is_dir(follow_symlinks=False):
+                        shutil.rmtree(item_path)
+                    elif file_stat is not None and self._worktree_sha(rel_path, item_path, now, file_stat) == sha1:
+                        # Contenu déjà en place : seul le bit exécutable peut différer
+                        file_mode = file_stat.st_mode
+                        if mode == "100755" and not file_mode & stat.S_IXUSR:
+                            os.chmod(item_path, file_mode | stat.S_IXUSR)
+                        elif mode != "100755" and file_mode & stat.S_IXUSR:
+                            os.chmod(item_path, file_mode & ~(stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH))
+                        continue
+                    else:
+                        os.unlink(item_path)
+                
+                writes.append((item_path, sha1, mode == "100755"))
+        
+        if len(writes) < self.CHECKOUT_PARALLEL_MIN:
+            for write in writes:
+                self._checkout_blob(write)
+        else:
+            # Lecture zlib et écriture relâchent le GIL : le pool de threads
+            # recouvre les E/S des nombreux petits fichiers
+            # (list() pour remonter la première erreur éventuelle)
+            list(self._executor().map(self._checkout_blob, writes))
+    
+    def _executor(self):
+        """
+        Pool de threads partagé, créé au premier besoin et gardé d'un appel à l'autre.
+        
+        Sert au checkout, à fetch/push et aux ls de SimpleGit. Les tâches
+        soumises ne doivent pas elles-mêmes attendre le pool.
+        """
+        if self._pool is None:
+            # Import différé (concurrent.futures charge logging) : un script qui
+            # ne fait que write/read ne le paie pas au démarrage
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self.POOL_WORKERS)
+        return self._pool
+    
+    def _checkout_blob(self, write: Tuple[str, str, bool]):
+        """Écrit un blob dans le working tree ; write = (chemin, sha, exécutable)."""
+        item_path, sha1, executable = write
+        obj_type, blob_content = self._read_object(sha1)
+        self._write_new_file(item_path, blob_content, executable)
     
     def tag(self, name: str, commit_sha: Optional[str] = None):
         """Crée un tag."""
@@ -601,8 +1410,8 @@ class TrueGit:
         if commit1 is None:
             return self._diff_working_tree()
         
-        tree1 = self._get_tree_files(commit1)
-        tree2 = self._get_tree_files(commit2 if commit2 else self._get_head_commit())
+        tree1 = self._get_tree_files(self._resolve_rev(commit1))
+        tree2 = self._get_tree_files(self._resolve_rev(commit2) if commit2 else self._get_head_commit())
         
         return self._compute_diff(tree1, tree2)
     
@@ -615,10 +1424,9 @@ class TrueGit:
         head_files = self._get_tree_files(head_commit)
         work_files = {}
         
-        for item in self.repo_path.rglob('*'):
-            if item.is_file() and '.git' not in item.parts:
-                rel_path = str(item.relative_to(self.repo_path))
-                work_files[rel_path] = item.read_text(errors='ignore')
+        for rel_path, full_path in self._iter_worktree_entries():
+            with open(full_path, errors='ignore') as f:
+                work_files[rel_path] = f.read()
         
         return self._compute_diff(head_files, work_files)
     
@@ -629,24 +1437,148 @@ class TrueGit:
         return self._walk_tree(tree_sha, prefix)
     
     def _walk_tree(self, tree_sha: str, prefix: str = "") -> Dict[str, str]:
-        """Parcourt récursivement un tree."""
+        """Parcourt un tree et retourne le contenu (décodé) de chaque fichier."""
         files = {}
-        obj_type, content = self._read_object(tree_sha)
-        entries = self._parse_tree(content)
+        for path, mode, sha1 in self._iter_tree_files(tree_sha, prefix):
+            obj_type, blob_content = self._read_object(sha1)
+            files[path] = blob_content.decode(errors='ignore')
+        return files
+    
+    def _walk_tree_shas(self, tree_sha: str, prefix: str = "") -> Dict[str, str]:
+        """Parcourt un tree et retourne le SHA de chaque fichier (sans lire les blobs)."""
+        return {path: sha1 for path, mode, sha1 in self._iter_tree_files(tree_sha, prefix)}
+    
+    def _tree_changes(self, old_tree: Optional[str], new_tree: Optional[str], prefix: str = "") -> List[str]:
+        """
+        Liste les fichiers ajoutés, modifiés ou supprimés entre deux trees.
+        
+        Les sous-trees identiques (même SHA) ne sont pas parcourus ; les
+        sous-trees qui diffèrent sont comparés avec une pile, sans récursion.
+        
+        Args:
+            old_tree: SHA du tree de départ (None = tree vide)
+            new_tree: SHA du tree d'arrivée (None = tree vide)
+            prefix: Chemin du tree dans le dépôt
         
-        for mode, name, sha1 in entries:
-            path = f"{prefix}/{name}" if prefix else name
+        Returns:
+            Liste des chemins de fichiers qui diffèrent
+        """
+        changed = []
+        stack = [(old_tree, new_tree, prefix)]
+        while stack:
+            old_tree, new_tree, prefix = stack.pop()
+            if old_tree == new_tree:
+                continue
             
-            if mode == "40000":
-                files.update(self._walk_tree(sha1, path))
-            else:
-                obj_type, blob_content = self._read_object(sha1)
-                files[path] = blob_content.decode(errors='ignore')
+            # Index par nom en cache ; les entrées qui diffèrent sont trouvées en une
+            # seule différence symétrique des couples (nom, (mode, sha)), en C
+            old_entries = self._tree_names(old_tree) if old_tree else {}
+            new_entries = self._tree_names(new_tree) if new_tree else {}
+            
+            for name in {name for name, _ in old_entries.items() ^ new_entries.items()}:
+                old = old_entries.get(name)
+                new = new_entries.get(name)
+                if old == new:
+                    continue
+                
+                path = f"{prefix}/{name}" if prefix else name
+                old_sub = old[1] if old and old[0] == "40000" else None
+                new_sub = new[1] if new and new[0] == "40000" else None
+                if old_sub or new_sub:
+                    stack.append((old_sub, new_sub, path))
+                if (old and old[0] != "40000") or (new and new[0] != "40000"):
+                    changed.append(path)
+        
+        return changed
+    
+    def _lookup_path(self, tree_sha: str, path: str) -> Optional[Tuple[str, str]]:
+        """
+        Cherche un chemin dans un tree sans parcourir le reste de l'arborescence.
         
-        return files
+        Args:
+            tree_sha: SHA du tree racine
+            path: Chemin relatif (vide = le tree racine lui-même)
+        
+        Returns:
+            Tuple (mode, sha) de l'entrée, ou None si introuvable
+        """
+        return self._lookup_parts(tree_sha, [part for part in path.strip("/").split("/") if part])
+    
+    def _lookup_parts(self, tree_sha: str, parts: List[str]) -> Optional[Tuple[str, str]]:
+        """Comme _lookup_path, avec un chemin déjà découpé en composants."""
+        entry = ("40000", tree_sha)
+        for part in parts:
+            if entry[0] != "40000":
+                return None
+            entry = self._tree_names(entry[1]).get(part)
+            if entry is None:
+                return None
+        return entry
+    
+    def _branch_tree(self, branch_name: str) -> str:
+        """Retourne le SHA du tree racine d'une branche."""
+        commit_sha = self._get_branch_commit(branch_name)
+        if not commit_sha:
+            raise ValueError(f"La branche {branch_name} n'existe pas")
+        return self._parse_commit(commit_sha)["tree"]
+    
+    def read_blob(self, branch_name: str, path: str) -> bytes:
+        """
+        Lit un fichier dans une branche sans changer de branche ni toucher au working tree.
+        
+        Args:
+            branch_name: Nom de la branche
+            path: Chemin relatif du fichier
+        
+        Returns:
+            Contenu brut du fichier
+        """
+        obj_type, content = self._read_object(self.resolve_blob(branch_name, path))
+        return content
+    
+    def resolve_blob(self, branch_name: str, path: str) -> str:
+        """
+        Retourne le SHA du blob d'un fichier dans une branche, sans lire son contenu.
+        
+        Args:
+            branch_name: Nom de la branche
+            path: Chemin relatif du fichier
+        
+        Returns:
+            SHA du blob
+        """
+        entry = self._lookup_path(self._branch_tree(branch_name), path)
+        if entry is None:
+            raise FileNotFoundError(f"{path} introuvable dans {branch_name}")
+        mode, sha1 = entry
+        if mode == "40000":
+            raise IsADirectoryError(f"{path} est un répertoire dans {branch_name}")
+        return sha1
+    
+    def ls_tree(self, branch_name: str, path: str = "") -> List[Tuple[str, str, str]]:
+        """
+        Liste les entrées d'un répertoire dans une branche sans changer de branche.
+        
+        Args:
+            branch_name: Nom de la branche
+            path: Chemin relatif du répertoire (vide = racine)
+        
+        Returns:
+            Liste de tuples (mode, nom, sha)
+        """
+        entry = self._lookup_path(self._branch_tree(branch_name), path)
+        if entry is None:
+            raise FileNotFoundError(f"{path} introuvable dans {branch_name}")
+        mode, sha1 = entry
+        if mode != "40000":
+            raise NotADirectoryError(f"{path} n'est pas un répertoire dans {branch_name}")
+        return self._read_tree(sha1)
     
     def _compute_diff(self, files1: Dict[str, str], files2: Dict[str, str]) -> str:
         """Calcule le diff entre deux ensembles de fichiers."""
+        # Import différé : inutile pour les usages courants (write/read)
+        import difflib
+        
         all_files = set(files1.keys()) | set(files2.keys())
         diff_output = []
         
@@ -664,8 +1596,7 @@ class TrueGit:
     
     def show(self, commit_sha: Optional[str] = None) -> str:
         """Affiche les informations d'un commit."""
-        if commit_sha is None:
-            commit_sha = self._get_head_commit()
+        commit_sha = self._resolve_rev(commit_sha) if commit_sha else self._get_head_commit()
         
         commit_info = self._parse_commit(commit_sha)
         output = f"commit {commit_sha}\n"
@@ -681,11 +1612,10 @@ class TrueGit:
     
     def reset(self, commit_sha: str, hard: bool = False):
         """Reset vers un commit."""
-        branch_file = self.git_dir / "refs" / "heads" / self._current_branch
-        branch_file.write_text(f"{commit_sha}\n")
+        self._set_branch_ref(self._current_branch, commit_sha)
         
         if hard:
-            self._checkout_tree(commit_sha)
+            self._checkout_tree(commit_sha, update_index=True)
     
     def mv(self, source: str, dest: str):
         """Déplace ou renomme un fichier."""
@@ -717,10 +1647,9 @@ class TrueGit:
             files = self._get_tree_files(commit_sha)
         else:
             files = {}
-            for item in self.repo_path.rglob('*'):
-                if item.is_file() and '.git' not in item.parts:
-                    rel_path = str(item.relative_to(self.repo_path))
-                    files[rel_path] = item.read_text(errors='ignore')
+            for rel_path, full_path in self._iter_worktree_entries():
+                with open(full_path, errors='ignore') as f:
+                    files[rel_path] = f.read()
         
         results = []
         for filepath, content in files.items():
@@ -732,11 +1661,10 @@ class TrueGit:
     
     def merge(self, branch_name: str) -> str:
         """Merge simple d'une branche (sans gestion des conflits)."""
-        branch_file = self.git_dir / "refs" / "heads" / branch_name
-        if not branch_file.exists():
+        other_commit = self._get_branch_commit(branch_name)
+        if other_commit is None:
             raise ValueError(f"La branche {branch_name} n'existe pas")
         
-        other_commit = branch_file.read_text().strip()
         current_commit = self._get_head_commit()
         
         if not current_commit:
@@ -753,18 +1681,16 @@ class TrueGit:
         
         merge_sha = self._hash_object(commit_content.encode(), "commit")
         
-        branch_file = self.git_dir / "refs" / "heads" / self._current_branch
-        branch_file.write_text(f"{merge_sha}\n")
+        self._set_branch_ref(self._current_branch, merge_sha)
         
         return merge_sha
     
     def rebase(self, target_branch: str):
         """Rebase simplifié (rejoue les commits)."""
-        target_file = self.git_dir / "refs" / "heads" / target_branch
-        if not target_file.exists():
+        target_commit = self._get_branch_commit(target_branch)
+        if target_commit is None:
             raise ValueError(f"La branche {target_branch} n'existe pas")
         
-        target_commit = target_file.read_text().strip()
         current_commits = self.log()
         
         # Sauvegarder la branche courante
@@ -810,32 +1736,31 @@ class TrueGit:
         deleted = []
         
         if head_commit:
-            head_files = self._get_tree_files(head_commit)
+            # SHA des fichiers de HEAD via les trees en cache, sans lire les blobs
+            head_files = self._walk_tree_shas(self._parse_commit(head_commit)["tree"])
             
             # Vérifier les fichiers du working tree
             current_files = set()
-            for item in self.repo_path.rglob('*'):
-                if item.is_file() and '.git' not in item.parts:
-                    rel_path = str(item.relative_to(self.repo_path))
-                    current_files.add(rel_path)
-                    current_content = item.read_text(errors='ignore')
-                    
-                    if rel_path in head_files:
-                        if head_files[rel_path] != current_content:
-                            modified.append(rel_path)
-                    else:
-                        untracked.append(rel_path)
+            now = time.time_ns()
+            for rel_path, full_path in self._iter_worktree_entries():
+                current_files.add(rel_path)
+                
+                head_sha = head_files.get(rel_path)
+                if head_sha is None:
+                    untracked.append(rel_path)
+                elif head_sha != self._worktree_sha(rel_path, full_path, now):
+                    modified.append(rel_path)
             
             # Détecter les fichiers supprimés (dans HEAD mais pas dans working tree)
-            for head_file in head_files.keys():
-                if head_file not in current_files:
-                    deleted.append(head_file)
+            deleted.extend(head_files.keys() - current_files)
+            
+            # Oublier les stat des fichiers qui ne sont plus là
+            if len(self._worktree_shas) > len(current_files):
+                for rel_path in self._worktree_shas.keys() - current_files:
+                    del self._worktree_shas[rel_path]
         else:
             # Pas de HEAD, tous les fichiers sont untracked
-            for item in self.repo_path.rglob('*'):
-                if item.is_file() and '.git' not in item.parts:
-                    rel_path = str(item.relative_to(self.repo_path))
-                    untracked.append(rel_path)
+            untracked.extend(self._iter_worktree_files())
         
         return {
             "branch": self._current_branch,
@@ -846,6 +1771,54 @@ class TrueGit:
             "untracked": sorted(untracked)
         }
     
+    def _worktree_sha(self, rel_path: str, full_path: str, now: int,
+                      st: Optional[os.stat_result] = None) -> str:
+        """
+        SHA de blob d'un fichier du working tree, rehashé seulement si son stat a changé.
+        
+        Comme l'index de git, un fichier modifié trop récemment (même mtime
+        possible qu'une modification suivante) n'est pas mis en cache.
+        
+        Args:
+            rel_path: Chemin relatif du fichier
+            full_path: Chemin absolu du fichier
+            now: Heure du parcours en nanosecondes
+            st: stat du fichier s'il est déjà connu (évite un second appel)
+        
+        Returns:
+            SHA du blob correspondant au contenu du fichier
+        """
+        if st is None:
+            st = os.stat(full_path)
+        key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        cached = self._worktree_shas.get(rel_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        sha1 = self._file_blob_sha(full_path, st.st_size)
+        if now - st.st_mtime_ns > self.RACY_NS:
+            self._worktree_shas[rel_path] = (key, sha1)
+        return sha1
+    
+    def _file_blob_sha(self, full_path: str, size: int) -> str:
+        """
+        SHA de blob d'un fichier, lu par blocs sans le charger entièrement en mémoire.
+        
+        Args:
+            full_path: Chemin absolu du fichier
+            size: Taille attendue (stat) ; si le fichier change pendant la
+                  lecture, il est relu d'un bloc
+        """
+        hasher = hashlib.sha1(f"blob {size}\0".encode())
+        read = 0
+        with open(full_path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK), b""):
+                hasher.update(chunk)
+                read += len(chunk)
+        if read != size:
+            with open(full_path, "rb") as f:
+                return self._blob_sha(f.read())
+        return hasher.hexdigest()
+    
     def cat_file(self, sha1: str) -> Tuple[str, bytes]:
         """Affiche le contenu d'un objet Git."""
         return self._read_object(sha1)
@@ -877,11 +1850,68 @@ class TrueGit:
         
         return commits[bad_idx]
     
+    def _copy_objects(self, src_objects: Path, dst_objects: Path):
+        """
+        Copie les objets absents de dst_objects, en parallèle.
+        
+        Les objets étant immuables, ceux déjà présents ne sont pas recopiés ;
+        les copies (des E/S qui relâchent le GIL) sont réparties sur un pool de threads.
+        Les objets déjà synchronisés avec un dépôt sont mémorisés par couple
+        (source, destination) : un push/pull répété ne relit que les nouveaux objets.
+        Le mémo est oublié si le répertoire destination a changé d'identité ou
+        de mtime depuis (dépôt recréé, gc qui retire des répertoires d'objets).
+        """
+        key = (os.path.realpath(src_objects), os.path.realpath(dst_objects))
+        memo = self._synced_objects.get(key)
+        if memo is not None and memo[0] == self._objects_dir_stamp(key[1]):
+            synced = memo[1]
+        else:
+            synced = set()
+        
+        missing = []
+        src_names = []
+        with os.scandir(key[0]) as dirs:
+            for obj_dir in dirs:
+                if len(obj_dir.name) != 2 or not obj_dir.is_dir():
+                    continue
+                with os.scandir(obj_dir.path) as files:
+                    names = [f"{obj_dir.name}/{obj_file.name}" for obj_file in files
+                             if not obj_file.name.endswith(".tmp")]
+                src_names.extend(names)
+                new_names = [name for name in names if name not in synced]
+                if not new_names:
+                    continue
+                dst_dir = os.path.join(key[1], obj_dir.name)
+                os.makedirs(dst_dir, exist_ok=True)
+                existing = set(os.listdir(dst_dir))
+                for name in new_names:
+                    if name[3:] not in existing:
+                        missing.append((os.path.join(key[0], name), os.path.join(key[1], name)))
+        
+        if missing:
+            # list() pour remonter la première erreur éventuelle
+            list(self._executor().map(lambda copy: shutil.copy(*copy), missing))
+        synced.update(src_names)
+        # Stamp pris après nos propres copies (qui créent des répertoires xx)
+        self._synced_objects[key] = (self._objects_dir_stamp(key[1]), synced)
+    
+    @staticmethod
+    def _objects_dir_stamp(path: str) -> Optional[Tuple[int, int, int]]:
+        """(périphérique, inode, mtime en ns) d'un répertoire objects, None s'il est absent."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_dev, st.st_ino, st.st_mtime_ns)
+    
     def fetch(self, remote_path: str):
-        """Fetch simplifié depuis un dépôt local."""
+        """Fetch simplifié depuis un dépôt local (objets manquants puis références)."""
         remote = Path(remote_path)
         remote_refs = remote / ".git" / "refs" / "heads"
         
+        # Les objets d'abord : une référence ne pointe jamais vers un objet absent
+        self._copy_objects(remote / ".git" / "objects", self.git_dir / "objects")
+        
         for branch_file in remote_refs.rglob('*'):
             if branch_file.is_file():
                 branch_name = str(branch_file.relative_to(remote_refs))
@@ -893,35 +1923,50 @@ class TrueGit:
         """Pull simplifié."""
         if branch_name is None:
             branch_name = self._current_branch
+        self.pull_many(remote_path, [branch_name])
+    
+    def pull_many(self, remote_path: str, branch_names: Iterable[str]):
+        """
+        Pull de plusieurs branches avec un seul fetch.
         
+        La branche courante est remise sur le commit distant (reset --hard),
+        les autres branches sont simplement déplacées.
+        """
         self.fetch(remote_path)
-        remote_ref = self.git_dir / "refs" / "remotes" / "origin" / branch_name
         
-        if remote_ref.exists():
+        for branch_name in branch_names:
+            remote_ref = self.git_dir / "refs" / "remotes" / "origin" / branch_name
+            if not remote_ref.exists():
+                continue
             remote_commit = remote_ref.read_text().strip()
-            self.reset(remote_commit, hard=True)
+            if branch_name == self._current_branch:
+                self.reset(remote_commit, hard=True)
+            else:
+                self._set_branch_ref(branch_name, remote_commit)
     
     def push(self, remote_path: str, branch_name: Optional[str] = None):
         """Push simplifié vers un dépôt local."""
         if branch_name is None:
             branch_name = self._current_branch
+        self.push_many(remote_path, [branch_name])
+    
+    def push_many(self, remote_path: str, branch_names: Optional[Iterable[str]] = None):
+        """
+        Push de plusieurs branches (toutes par défaut) vers un dépôt local.
         
-        remote = Path(remote_path)
-        local_branch = self.git_dir / "refs" / "heads" / branch_name
-        remote_branch = remote / ".git" / "refs" / "heads" / branch_name
-        
-        if not local_branch.exists():
-            raise ValueError(f"La branche {branch_name} n'existe pas")
-        
-        remote_branch.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy(local_branch, remote_branch)
+        Les objets manquants sont copiés une seule fois pour toutes les
+        branches, puis les références distantes sont mises à jour.
+        """
+        branch_names = list(self._refs()) if branch_names is None else list(branch_names)
+        for branch_name in branch_names:
+            if not self.branch_exists(branch_name):
+                raise ValueError(f"La branche {branch_name} n'existe pas")
         
-        local_objects = self.git_dir / "objects"
-        remote_objects = remote / ".git" / "objects"
+        remote = Path(remote_path)
+        # Les objets d'abord : une référence ne pointe jamais vers un objet absent
+        self._copy_objects(self.git_dir / "objects", remote / ".git" / "objects")
         
-        for obj_dir in local_objects.iterdir():
-            if obj_dir.is_dir() and len(obj_dir.name) == 2:
-                remote_obj_dir = remote_objects / obj_dir.name
-                remote_obj_dir.mkdir(exist_ok=True)
-                for obj_file in obj_dir.iterdir():
-                    shutil.copy(obj_file, remote_obj_dir / obj_file.name)
\ No newline at end of file
+        for branch_name in branch_names:
+            remote_branch = remote / ".git" / "refs" / "heads" / branch_name
+            remote_branch.parent.mkdir(parents=True, exist_ok=True)
+            remote_branch.write_text(f"{self._get_branch_commit(branch_name)}\n")